@@ -49,6 +49,10 @@ try:
     notification_service.create_notifications_table()
     review_service.create_reviews_table()
     print("✅ Todas as tabelas criadas!")
+    
+    # Aplica migrações pendentes (índices, colunas novas, backfills)
+    import migrations
+    migrations.run_migrations()
 except Exception as e:
     print(f"⚠️  Aviso ao criar tabelas: {e}")
 
@@ -66,18 +70,12 @@ register_socketio_events(socketio)
 register_notification_events(socketio)
 
 
-@app.before_request
-def auto_complete_appointments():
-    """
-    Middleware executado antes de cada requisição HTTP.
-    Verifica e marca automaticamente como concluídos os agendamentos
-    que já passaram da data/hora agendada.
-    """
-    try:
-        services.auto_complete_past_appointments()
-    except Exception as e:
-        # Não bloqueia a requisição se houver erro na verificação automática
-        print(f"Erro ao auto-completar agendamentos: {e}")
+# Tarefas periódicas (auto-conclusão de agendamentos etc.) fora do ciclo das requisições
+from config import Config
+from scheduler import create_scheduler
+scheduler = create_scheduler(app, socketio)
+if Config.SCHEDULER_ENABLED:
+    scheduler.start()
 
 
 @app.errorhandler(404)
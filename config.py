@@ -26,6 +26,30 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     
+    # Pool de conexões pymysql (serviços de SQL puro)
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))  # Máximo de conexões abertas por processo
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))  # Espera máxima por uma conexão (s)
+    DB_POOL_IDLE_TIMEOUT = float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300))  # Fecha conexões ociosas (s)
+    DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', 30))  # Ping no checkout após ociosidade (s)
+    # Threads do bundle de analytics (cada uma usa uma conexão do pool; manter abaixo de DB_POOL_SIZE)
+    ANALYTICS_BUNDLE_WORKERS = int(os.getenv('ANALYTICS_BUNDLE_WORKERS', 4))
+    
+    # Réplica de leitura (opcional, mesmo formato de DATABASE_URL)
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL')
+    DB_REPLICA_MAX_LAG = int(os.getenv('DB_REPLICA_MAX_LAG', 30))  # Atraso máximo aceito (s)
+    DB_REPLICA_RETRY_AFTER = int(os.getenv('DB_REPLICA_RETRY_AFTER', 30))  # Pausa após falha (s)
+    DB_REPLICA_LAG_CHECK_INTERVAL = int(os.getenv('DB_REPLICA_LAG_CHECK_INTERVAL', 5))  # (s)
+    
+    # Métricas de consultas por requisição (cabeçalho Server-Timing e aviso de N+1)
+    QUERY_METRICS_ENABLED = os.getenv('QUERY_METRICS_ENABLED', 'true').lower() == 'true'
+    QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', 5))  # Repetições antes do aviso
+    
+    # Agendador de tarefas em segundo plano
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_JITTER = float(os.getenv('SCHEDULER_JITTER', 0.1))  # Fração do intervalo
+    AUTO_COMPLETE_INTERVAL = int(os.getenv('AUTO_COMPLETE_INTERVAL', 3600))  # Reconciliação completa (s)
+    DUE_TIMER_RESOLUTION = float(os.getenv('DUE_TIMER_RESOLUTION', 1))  # Consulta ao heap de términos (s)
+    
     # Sessão
     SESSION_COOKIE_SAMESITE = 'Lax'
     SESSION_COOKIE_HTTPONLY = True
@@ -84,6 +108,19 @@ class Config:
     SLOT_DURATION = 30  # Duração padrão do slot em minutos
     MIN_ADVANCE_BOOKING = 60  # Mínimo de minutos de antecedência
     MAX_ADVANCE_BOOKING = 90  # Máximo de dias de antecedência
+    SCHEDULE_INDEX_MAX_DAYS = 5000  # Dias (profissional, data) mantidos no índice de intervalos
+    SCHEDULE_INDEX_TTL = 60  # Validade de um dia do índice (s): cobre escritas de outros workers
+    AVAILABILITY_CACHE_MAX_ENTRIES = 20000  # Resultados (profissional, data, duração) em cache
+    AVAILABILITY_CACHE_TTL = 60  # Validade de um resultado de disponibilidade (s): no máximo SCHEDULE_INDEX_TTL
+    FIRST_AVAILABLE_CHUNK_DAYS = 7  # Dias carregados por vez na busca do primeiro horário livre
+    FIRST_AVAILABLE_MAX_RESULTS = 20  # Máximo de horários por busca
+    ICS_PAST_DAYS = 30  # Dias passados incluídos no feed de calendário
+    ICS_ETAG_TTL = 60  # Validade do ETag do feed sem escrita local (s)
+    CATALOG_CACHE_TTL = 300  # Validade do catálogo (serviços e profissionais) em memória (s)
+    CATALOG_MAX_AGE = 60  # max-age do catálogo no navegador (s)
+    ANALYTICS_CACHE_TTL = 120  # Validade de um resultado de analytics em cache (s)
+    ANALYTICS_CACHE_MAX_ENTRIES = 5000  # Resultados (usuário, widget, período) em cache
+    MAX_SERIES_OCCURRENCES = 26  # Ocorrências por agendamento recorrente/em lote
     CANCELLATION_DEADLINE = 120  # Prazo mínimo para cancelamento (minutos)
     
     # Notificações
@@ -0,0 +1,100 @@
+"""
+Manutenção da tabela de fatos appointment_daily_stats.
+
+Cada agendamento com início conhecido conta 1 na linha
+(profissional, dia, hora, cliente, serviço, status). As escritas pelo ORM
+atualizam a contagem na mesma transação (eventos de mapper); caminhos em lote
+(INSERT em lote, UPDATE condicional) chamam ``apply`` com os deltas.
+``rebuild`` recalcula a tabela inteira a partir de appointments; o teste
+tests/test_daily_stats.py confere que os dois caminhos dão o mesmo resultado.
+
+Uso: ``python -m migrations rebuild-stats``
+"""
+from collections import Counter
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import mysql, sqlite
+
+from db import Appointment, AppointmentDailyStat
+
+KEY_COLUMNS = ('barbeiro_id', 'day', 'hour', 'cliente_id', 'servico_id', 'status')
+
+
+def _upsert(dialect_name):
+    """INSERT que soma na linha existente (ON DUPLICATE KEY no MySQL, ON CONFLICT no SQLite dos testes)."""
+    table = AppointmentDailyStat.__table__
+    if dialect_name == 'sqlite':
+        statement = sqlite.insert(table)
+        return statement.on_conflict_do_update(
+            index_elements=KEY_COLUMNS,
+            set_={'appointments': table.c.appointments + statement.excluded.appointments}
+        )
+    statement = mysql.insert(table)
+    return statement.on_duplicate_key_update(
+        appointments=table.c.appointments + statement.inserted.appointments
+    )
+
+
+def stat_key(barbeiro_id, cliente_id, servico_id, status, start_at):
+    """Linha da tabela de fatos de um agendamento (None se não há início)."""
+    if start_at is None:
+        return None
+    return (int(barbeiro_id or 0), start_at.date(), start_at.hour,
+            int(cliente_id or 0), int(servico_id or 0), status or '')
+
+
+def appointment_key(appointment):
+    return stat_key(appointment.barbeiro_id, appointment.cliente_id, appointment.servico_id,
+                    appointment.status, appointment.start_at)
+
+
+def apply(connection, deltas):
+    """Soma ``deltas`` ({chave: +n/-n}) na tabela, na transação de ``connection``."""
+    rows = [dict(zip(KEY_COLUMNS, key), appointments=delta)
+            for key, delta in deltas.items() if key is not None and delta]
+    if rows:
+        connection.execute(_upsert(connection.dialect.name), rows)
+
+
+def rebuild(cursor):
+    """Recalcula a tabela a partir de appointments; retorna o número de linhas."""
+    cursor.execute("DELETE FROM appointment_daily_stats")
+    cursor.execute("""
+        INSERT INTO appointment_daily_stats
+            (barbeiro_id, day, hour, cliente_id, servico_id, status, appointments)
+        SELECT COALESCE(barbeiro_id, 0), DATE(start_at), HOUR(start_at),
+               COALESCE(cliente_id, 0), COALESCE(servico_id, 0), COALESCE(status, ''), COUNT(*)
+        FROM appointments
+        WHERE start_at IS NOT NULL
+        GROUP BY 1, 2, 3, 4, 5, 6
+    """)
+    return cursor.rowcount
+
+
+def _previous_key(target):
+    """Chave do agendamento antes das alterações pendentes nesta flush."""
+    state = inspect(target)
+
+    def previous(name):
+        history = state.attrs[name].history
+        return history.deleted[0] if history.deleted else getattr(target, name)
+
+    return stat_key(previous('barbeiro_id'), previous('cliente_id'), previous('servico_id'),
+                    previous('status'), previous('start_at'))
+
+
+@event.listens_for(Appointment, 'after_insert')
+def _count_insert(mapper, connection, target):
+    apply(connection, {appointment_key(target): 1})
+
+
+@event.listens_for(Appointment, 'after_update')
+def _count_update(mapper, connection, target):
+    old, new = _previous_key(target), appointment_key(target)
+    if old != new:
+        apply(connection, Counter({old: -1, new: 1}))
+
+
+@event.listens_for(Appointment, 'after_delete')
+def _count_delete(mapper, connection, target):
+    apply(connection, {_previous_key(target): -1})
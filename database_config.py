@@ -1,20 +1,36 @@
-"""Configuração de conexão com o banco de dados MySQL."""
-import pymysql
+"""Configuração de conexão com o banco de dados MySQL.
+
+As conexões pymysql usadas pelos serviços de SQL puro (analytics, notificações,
+avaliações, chat) vêm de um pool compartilhado pelo processo. O ``close()``
+chamado pelos serviços devolve a conexão ao pool em vez de encerrá-la.
+
+Dentro de uma requisição (ou evento Socket.IO) os serviços compartilham uma
+única conexão e uma única transação, confirmada ao final da requisição.
+
+Leituras pesadas marcadas com ``@tolerates_replica_lag`` vão para a réplica
+configurada em DATABASE_REPLICA_URL, voltando ao primário se ela falhar.
+"""
 import os
+import sys
+import time
+import functools
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
 from dotenv import load_dotenv
 
+from config import Config
+
 load_dotenv()
 
 
-def get_database_connection():
-    """Retorna uma conexão com o banco de dados MySQL."""
+def _parse_database_url(database_url):
+    """Converte a DATABASE_URL (formato customizado) em parâmetros do pymysql."""
     from urllib.parse import unquote
-    
-    # Parse DATABASE_URL do .env
+
     # Formato: root@localhost:3306@pjn%402024@CorteDigital
-    database_url = os.getenv('DATABASE_URL', 'root@localhost:3306@pjn%402024@CorteDigital')
-    
-    # Parse manual (formato customizado)
     parts = database_url.split('@')
     if len(parts) >= 4:
         user = parts[0]
@@ -30,16 +46,665 @@ def get_database_connection():
         port = 3306
         password = 'pjn@2024'
         database = 'CorteDigital'
-    
-    connection = pymysql.connect(
-        host=host,
-        port=port,
-        user=user,
-        password=password,
-        database=database,
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor,
-        autocommit=False
+
+    return {
+        'host': host,
+        'port': port,
+        'user': user,
+        'password': password,
+        'database': database,
+    }
+
+
+def _gevent_sem_patch():
+    """Indica se o gevent está carregado sem monkey-patch do módulo threading."""
+    if 'gevent' not in sys.modules:
+        return False
+    try:
+        from gevent import monkey
+        return not monkey.is_module_patched('threading')
+    except ImportError:
+        return False
+
+
+def _new_lock():
+    if _gevent_sem_patch():
+        from gevent.lock import RLock
+        return RLock()
+    return threading.Lock()
+
+
+def _new_local():
+    if _gevent_sem_patch():
+        from gevent.local import local
+        return local()
+    return threading.local()
+
+
+def _new_event():
+    if _gevent_sem_patch():
+        from gevent.event import Event
+        return Event()
+    return threading.Event()
+
+
+class _GreenletFuture:
+    """Resultado de um greenlet com a interface de ``concurrent.futures.Future``."""
+
+    def __init__(self, greenlet):
+        self._greenlet = greenlet
+
+    def result(self, timeout=None):
+        return self._greenlet.get(timeout=timeout)
+
+
+class _GreenletExecutor:
+    """``submit()`` sobre um gevent.pool.Pool limitado a ``max_workers`` greenlets."""
+
+    def __init__(self, max_workers):
+        from gevent.pool import Pool
+        self._pool = Pool(max_workers)
+
+    def submit(self, func, *args, **kwargs):
+        return _GreenletFuture(self._pool.spawn(func, *args, **kwargs))
+
+
+def _new_executor(max_workers, thread_name_prefix=''):
+    """Executor de tarefas paralelas: greenlets com gevent sem monkey-patch, threads nos demais casos.
+
+    Threads nativas não podem esperar pelas primitivas do gevent do pool de
+    conexões, e o greenlet da requisição esperando uma thread trava o hub.
+    """
+    if _gevent_sem_patch():
+        return _GreenletExecutor(max_workers)
+    from concurrent.futures import ThreadPoolExecutor
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+
+def _new_semaphore(value):
+    if _gevent_sem_patch():
+        from gevent.lock import BoundedSemaphore
+        return BoundedSemaphore(value)
+    return threading.BoundedSemaphore(value)
+
+
+class PoolTimeout(Exception):
+    """Nenhuma conexão ficou disponível dentro do tempo de espera do pool."""
+
+
+class PooledConnection:
+    """Conexão emprestada do pool.
+
+    Repassa tudo para a conexão pymysql real; ``close()`` apenas devolve a
+    conexão ao pool, desfazendo qualquer transação que tenha ficado aberta.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._closed = False
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.release(self._raw)
+
+    def discard(self):
+        """Fecha a conexão real em vez de devolvê-la (ex.: leitura sem buffer interrompida)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._pool.release(self._raw, discard=True)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ConnectionPool:
+    """Pool limitado de conexões pymysql, seguro para threads e greenlets.
+
+    - ``max_size``: máximo de conexões abertas (emprestadas + ociosas);
+    - ``timeout``: segundos que um checkout espera por uma vaga;
+    - ``idle_timeout``: conexões ociosas por mais tempo que isso são fechadas;
+    - ``ping_after``: conexões ociosas por mais tempo que isso recebem um
+      ``ping()`` no checkout antes de serem entregues.
+    """
+
+    def __init__(self, connect_kwargs, max_size=10, timeout=10.0,
+                 idle_timeout=300.0, ping_after=30.0):
+        self.connect_kwargs = connect_kwargs
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+
+        self._slots = _new_semaphore(max_size)
+        self._lock = _new_lock()
+        self._idle = deque()  # (conexão, momento em que ficou ociosa)
+        self._stats = {
+            'checkouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'timeouts': 0,
+            'in_use': 0,
+            'wait_total_ms': 0.0,
+            'wait_max_ms': 0.0,
+        }
+
+    def _connect(self):
+        from query_metrics import InstrumentedDictCursor
+
+        connection = pymysql.connect(
+            charset='utf8mb4',
+            cursorclass=InstrumentedDictCursor,
+            autocommit=False,
+            **self.connect_kwargs
+        )
+        with self._lock:
+            self._stats['created'] += 1
+        return connection
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats['discarded'] += 1
+
+    def _take_idle(self):
+        """Retira a conexão ociosa mais recente que ainda esteja viva."""
+        while True:
+            now = time.monotonic()
+            expired = []
+            connection = None
+            with self._lock:
+                # As conexões mais antigas ficam à esquerda da fila
+                while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                    expired.append(self._idle.popleft()[0])
+                if self._idle:
+                    connection, idle_since = self._idle.pop()
+
+            for old in expired:
+                self._discard(old)
+
+            if connection is None:
+                return None
+
+            if now - idle_since > self.ping_after:
+                try:
+                    connection.ping(reconnect=False)
+                except Exception:
+                    self._discard(connection)
+                    continue
+
+            return connection
+
+    def acquire(self):
+        """Empresta uma conexão, esperando até ``timeout`` segundos por uma vaga."""
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise PoolTimeout(
+                f"Pool de conexões esgotado ({self.max_size} em uso) após {self.timeout}s"
+            )
+        waited_ms = (time.monotonic() - started) * 1000
+
+        try:
+            connection = self._take_idle() or self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['in_use'] += 1
+            self._stats['wait_total_ms'] += waited_ms
+            self._stats['wait_max_ms'] = max(self._stats['wait_max_ms'], waited_ms)
+
+        return PooledConnection(self, connection)
+
+    def release(self, connection, discard=False):
+        """Devolve uma conexão ao pool (chamado por ``PooledConnection.close``).
+
+        Sempre desfaz a transação: com autocommit=False qualquer comando depois
+        de um commit (até um SELECT) abre outra transação implícita.
+        """
+        try:
+            if discard:
+                self._discard(connection)
+                return
+            connection.rollback()
+            if connection.open:
+                with self._lock:
+                    self._idle.append((connection, time.monotonic()))
+            else:
+                self._discard(connection)
+        except Exception:
+            self._discard(connection)
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._slots.release()
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection, _ in idle:
+            self._discard(connection)
+
+    def stats(self):
+        """Métricas do pool, incluindo o tempo de espera no checkout."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+        stats['max_size'] = self.max_size
+        checkouts = stats['checkouts']
+        stats['wait_avg_ms'] = round(stats['wait_total_ms'] / checkouts, 3) if checkouts else 0.0
+        stats['wait_total_ms'] = round(stats['wait_total_ms'], 3)
+        stats['wait_max_ms'] = round(stats['wait_max_ms'], 3)
+        return stats
+
+
+_pool = None
+_pool_pid = None
+_replica_pool = None
+_pool_lock = threading.Lock()
+
+# Estado de saúde da réplica (compartilhado pelo processo, protegido por _replica_lock)
+_replica_state = {
+    'down_until': 0.0,
+    'lag': None,
+    'lag_checked_at': 0.0,
+    'fallbacks': 0,
+}
+_replica_lock = None
+
+# Roteamento da chamada atual (por thread/greenlet), criado no primeiro uso
+# como os pools, quando já se sabe se o gevent está carregado
+_routing = None
+
+
+def _routing_local():
+    global _routing
+    if _routing is None:
+        with _pool_lock:
+            if _routing is None:
+                _routing = _new_local()
+    return _routing
+
+
+def _new_pool(database_url):
+    return ConnectionPool(
+        _parse_database_url(database_url),
+        max_size=Config.DB_POOL_SIZE,
+        timeout=Config.DB_POOL_TIMEOUT,
+        idle_timeout=Config.DB_POOL_IDLE_TIMEOUT,
+        ping_after=Config.DB_POOL_PING_AFTER,
     )
-    
+
+
+def _ensure_pools():
+    """Cria os pools no primeiro uso (e de novo após um fork)."""
+    global _pool, _pool_pid, _replica_pool, _replica_lock
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            # Conexões herdadas de outro processo não são reaproveitadas
+            database_url = os.getenv('DATABASE_URL', 'root@localhost:3306@pjn%402024@CorteDigital')
+            _pool = _new_pool(database_url)
+            replica_url = os.getenv('DATABASE_REPLICA_URL') or Config.DATABASE_REPLICA_URL
+            _replica_pool = _new_pool(replica_url) if replica_url else None
+            _replica_lock = _new_lock()
+            _replica_state.update(down_until=0.0, lag=None, lag_checked_at=0.0)
+            _pool_pid = pid
+
+
+def get_pool():
+    """Retorna o pool do primário para o processo atual."""
+    _ensure_pools()
+    return _pool
+
+
+def get_replica_pool():
+    """Retorna o pool da réplica de leitura, ou None se não houver réplica configurada."""
+    _ensure_pools()
+    return _replica_pool
+
+
+def get_pool_stats():
+    """Métricas do pool de conexões do processo atual (e da réplica, se houver)."""
+    stats = get_pool().stats()
+    replica_pool = get_replica_pool()
+    if replica_pool is not None:
+        with _replica_lock:
+            state = dict(_replica_state)
+        stats['replica'] = replica_pool.stats()
+        stats['replica']['healthy'] = time.monotonic() >= state['down_until']
+        stats['replica']['lag'] = state['lag']
+        stats['replica']['fallbacks'] = state['fallbacks']
+    return stats
+
+
+def _check_replica_lag(connection):
+    """Atraso da réplica em segundos (0 para uma instância independente, None se parada)."""
+    cursor = connection.cursor()
+    try:
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except pymysql.err.MySQLError:
+            cursor.execute("SHOW SLAVE STATUS")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+
+    if not row:
+        # Sem replicação configurada (ex.: duas instâncias locais para testes)
+        return 0
+    lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+    return None if lag is None else int(lag)
+
+
+def _acquire_replica(max_lag):
+    """Empresta uma conexão da réplica, ou None se ela estiver indisponível ou atrasada."""
+    replica_pool = get_replica_pool()
+    if replica_pool is None:
+        return None
+
+    now = time.monotonic()
+    with _replica_lock:
+        if now < _replica_state['down_until']:
+            _replica_state['fallbacks'] += 1
+            return None
+
+    try:
+        connection = replica_pool.acquire()
+    except Exception as e:
+        print(f"⚠️  Réplica indisponível, usando o primário: {e}")
+        with _replica_lock:
+            _replica_state['down_until'] = now + Config.DB_REPLICA_RETRY_AFTER
+            _replica_state['fallbacks'] += 1
+        return None
+
+    with _replica_lock:
+        # Só uma chamada por intervalo consulta o atraso; as demais usam o último valor
+        check_lag = now - _replica_state['lag_checked_at'] > Config.DB_REPLICA_LAG_CHECK_INTERVAL
+        if check_lag:
+            _replica_state['lag_checked_at'] = now
+    if check_lag:
+        try:
+            lag = _check_replica_lag(connection)
+        except pymysql.err.MySQLError:
+            # Sem permissão para consultar o status: assume réplica em dia
+            lag = 0
+        with _replica_lock:
+            _replica_state['lag'] = lag
+
+    with _replica_lock:
+        lag = _replica_state['lag']
+        lagging = lag is None or lag > max_lag
+        if lagging:
+            _replica_state['fallbacks'] += 1
+    if lagging:
+        connection.close()
+        return None
+
     return connection
+
+
+def tolerates_replica_lag(max_lag=None):
+    """Decorador para funções somente leitura que aceitam dados da réplica.
+
+    Dentro da função decorada, ``get_database_connection()`` usa a réplica
+    configurada em DATABASE_REPLICA_URL desde que o atraso dela não passe de
+    ``max_lag`` segundos; caso contrário (ou sem réplica) usa o primário.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            routing = _routing_local()
+            previous = getattr(routing, 'max_lag', None)
+            routing.max_lag = max_lag if max_lag is not None else Config.DB_REPLICA_MAX_LAG
+            try:
+                return func(*args, **kwargs)
+            finally:
+                routing.max_lag = previous
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def read_from_primary():
+    """Dentro do bloco, funções com ``@tolerates_replica_lag`` leem do primário.
+
+    Para recalcular algo logo depois de uma escrita, quando a réplica ainda
+    pode não ter recebido o COMMIT.
+    """
+    routing = _routing_local()
+    previous = getattr(routing, 'primary', False)
+    routing.primary = True
+    try:
+        yield
+    finally:
+        routing.primary = previous
+
+
+class _RequestScope:
+    """Conexões compartilhadas por uma requisição HTTP ou evento Socket.IO."""
+
+    def __init__(self):
+        self.connection = None
+        self.replica_connection = None
+        self.replica_unavailable = False
+        self.commit_requested = False
+        self.after_commit = []
+        self.savepoints = 0
+
+    def get_connection(self):
+        if self.connection is None:
+            self.connection = get_pool().acquire()
+        return ScopedConnection(self, self.connection)
+
+    def get_replica_connection(self, max_lag):
+        # Depois de uma escrita, a requisição lê do primário (read-your-writes)
+        if self.commit_requested or self.replica_unavailable:
+            return self.get_connection()
+        if self.replica_connection is None:
+            self.replica_connection = _acquire_replica(max_lag)
+            if self.replica_connection is None:
+                self.replica_unavailable = True
+                return self.get_connection()
+        return ScopedConnection(self, self.replica_connection, savepoints=False)
+
+    def finish(self, commit=True):
+        """Confirma (se algum serviço pediu commit) ou desfaz, e devolve ao pool."""
+        replica, self.replica_connection = self.replica_connection, None
+        if replica is not None:
+            replica.close()
+
+        callbacks, self.after_commit = self.after_commit, []
+        connection, self.connection = self.connection, None
+        if connection is None:
+            return
+        committed = False
+        try:
+            # Sem commit, o rollback da devolução ao pool desfaz a transação
+            if commit and self.commit_requested:
+                connection.commit()
+                committed = True
+        finally:
+            self.commit_requested = False
+            connection.close()
+
+        if committed:
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"⚠️  Erro em callback pós-commit: {e}")
+
+
+class ScopedConnection:
+    """Visão de uma conexão de escopo de requisição entregue aos serviços.
+
+    ``commit()`` é adiado para o fim da requisição (um único COMMIT por
+    requisição); ``close()`` não faz nada, pois a conexão continua com o escopo.
+
+    Cada serviço tem o seu ponto de retorno: o primeiro ``cursor()`` e cada
+    ``commit()`` gravam um SAVEPOINT, e ``rollback()`` volta só até ele. Assim
+    o rollback de um serviço não desfaz o que outro serviço da mesma
+    requisição já confirmou.
+    """
+
+    def __init__(self, scope, connection, savepoints=True):
+        self._scope = scope
+        self._connection = connection
+        self._savepoints = savepoints
+        self._savepoint = None
+        self._commit_requested = False
+        self._callbacks = 0
+
+    def _mark(self):
+        scope = self._scope
+        scope.savepoints += 1
+        self._savepoint = f"sp_{scope.savepoints}"
+        self._commit_requested = scope.commit_requested
+        self._callbacks = len(scope.after_commit)
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(f"SAVEPOINT {self._savepoint}")
+        finally:
+            cursor.close()
+
+    def cursor(self, *args, **kwargs):
+        if self._savepoints and self._savepoint is None:
+            self._mark()
+        return self._connection.cursor(*args, **kwargs)
+
+    def commit(self):
+        self._scope.commit_requested = True
+        if self._savepoints:
+            self._mark()
+
+    def rollback(self):
+        scope = self._scope
+        if not self._savepoints:
+            self._connection.rollback()
+            return
+        if self._savepoint is None:
+            # Nada foi executado por este serviço
+            return
+
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {self._savepoint}")
+        except pymysql.err.MySQLError as e:
+            # DDL faz COMMIT implícito e apaga os savepoints: desfaz a transação inteira
+            print(f"⚠️  Savepoint perdido, desfazendo a transação da requisição: {e}")
+            self._connection.rollback()
+            scope.commit_requested = False
+            scope.after_commit.clear()
+            self._savepoint = None
+            return
+        finally:
+            cursor.close()
+
+        scope.commit_requested = self._commit_requested
+        del scope.after_commit[self._callbacks:]
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _current_scope(create=True):
+    """Escopo da requisição/evento atual, ou None fora de um contexto Flask."""
+    from flask import g, has_app_context
+
+    if not has_app_context():
+        return None
+    scope = g.get('_db_scope')
+    if scope is None and create:
+        scope = g._db_scope = _RequestScope()
+    return scope
+
+
+def get_database_connection():
+    """Retorna uma conexão com o banco de dados MySQL.
+
+    Dentro de uma requisição HTTP ou de um evento Socket.IO todos os serviços
+    compartilham a mesma conexão, confirmada uma única vez ao final. Fora de
+    um contexto Flask a conexão vem direto do pool e ``close()`` a devolve.
+    Funções marcadas com ``@tolerates_replica_lag`` leem da réplica.
+    """
+    routing = _routing_local()
+    max_lag = None if getattr(routing, 'primary', False) else getattr(routing, 'max_lag', None)
+    scope = _current_scope()
+
+    if scope is None:
+        if max_lag is not None:
+            replica = _acquire_replica(max_lag)
+            if replica is not None:
+                return replica
+        return get_pool().acquire()
+
+    if max_lag is not None:
+        return scope.get_replica_connection(max_lag)
+    return scope.get_connection()
+
+
+def call_after_commit(callback):
+    """Executa ``callback`` depois que a escrita atual for de fato confirmada.
+
+    Dentro de uma requisição o COMMIT só acontece no fim dela (e um rollback
+    descarta o callback); fora de um contexto Flask o ``commit()`` já foi real
+    e o callback roda na hora.
+    """
+    scope = _current_scope(create=False)
+    if scope is None or scope.connection is None:
+        callback()
+    else:
+        scope.after_commit.append(callback)
+
+
+def init_app(app):
+    """Registra a finalização da conexão de escopo de requisição."""
+
+    @app.after_request
+    def _commit_request_connection(response):
+        # Confirma antes de a resposta sair; erros 5xx desfazem a transação
+        scope = _current_scope(create=False)
+        if scope is not None:
+            scope.finish(commit=response.status_code < 500)
+        return response
+
+    @app.teardown_appcontext
+    def _release_request_connection(exc):
+        # Eventos Socket.IO e contextos sem resposta HTTP terminam aqui
+        scope = _current_scope(create=False)
+        if scope is not None:
+            try:
+                scope.finish(commit=exc is None)
+            except Exception as e:
+                app.logger.error(f"Erro ao finalizar conexão da requisição: {e}")
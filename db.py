@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import datetime, timedelta
+from sqlalchemy import event, inspect
 from sqlalchemy.dialects.mysql import LONGTEXT
 import json
 
@@ -11,6 +12,58 @@ DEFAULT_HORARIOS = [
     "13:00", "14:00", "15:00", "16:00", "17:00", "18:00"
 ]
 
+# Duração usada quando o serviço não informa a sua (minutos)
+DEFAULT_DURACAO = 30
+
+# Status que não ocupam a agenda do profissional
+FREE_STATUSES = ("cancelado",)
+
+# Granularidade dos blocos reservados por agendamento em appointment_slot_claims (minutos)
+SLOT_CLAIM_MINUTES = 15
+
+# appointment_id das reservas feitas por bloqueios (BlockedTime) em appointment_slot_claims
+BLOCK_CLAIM_PREFIX = "bloqueio:"
+
+
+def block_claim_id(block_id):
+    return f"{BLOCK_CLAIM_PREFIX}{block_id}"
+
+
+def appointment_bounds(date, time, duracao=None):
+    """Converte data ("2025-12-06") e hora ("14:30") em (start_at, end_at).
+
+    Retorna (None, None) se a data ou a hora forem inválidas.
+    """
+    try:
+        start_at = datetime.strptime(f"{date} {str(time)[:5]}", "%Y-%m-%d %H:%M")
+    except (TypeError, ValueError):
+        return None, None
+    return start_at, start_at + timedelta(minutes=duracao or DEFAULT_DURACAO)
+
+
+def block_bounds(data, hora_inicio, hora_fim):
+    """(start_at, end_at) de um bloqueio ("2025-12-06", "12:00", "13:00"); (None, None) se inválido."""
+    try:
+        day = datetime.strptime(data, "%Y-%m-%d")
+        start = [int(part) for part in hora_inicio.split(":")[:2]]
+        end = [int(part) for part in hora_fim.split(":")[:2]]
+    except (AttributeError, TypeError, ValueError):
+        return None, None
+    return (day + timedelta(hours=start[0], minutes=start[1]),
+            day + timedelta(hours=end[0], minutes=end[1]))
+
+
+def slot_claim_starts(start_at, end_at):
+    """Inícios dos blocos de SLOT_CLAIM_MINUTES que o intervalo [start_at, end_at) toca."""
+    step = timedelta(minutes=SLOT_CLAIM_MINUTES)
+    slot = start_at.replace(second=0, microsecond=0)
+    slot -= timedelta(minutes=slot.minute % SLOT_CLAIM_MINUTES)
+    slots = []
+    while slot < end_at:
+        slots.append(slot)
+        slot += step
+    return slots
+
 
 class Cliente(db.Model):
     __tablename__ = "clientes"
@@ -120,7 +173,14 @@ class Service(db.Model):
 
 
 class Appointment(db.Model):
-    """Agendamentos de serviços"""
+    """Agendamentos de serviços
+
+    A tabela de fatos appointment_daily_stats acompanha cada escrita pelo ORM
+    (eventos de mapper em daily_stats.py). INSERT/UPDATE/DELETE em lote
+    (``db.insert(Appointment)``, ``query.update()``, ``query.delete()``) não
+    disparam esses eventos: quem escreve assim deve chamar
+    ``daily_stats.apply`` com os deltas na mesma transação.
+    """
     __tablename__ = "appointments"
     id = db.Column(db.String(50), primary_key=True)
     cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'))
@@ -139,9 +199,27 @@ class Appointment(db.Model):
     created_at = db.Column(db.String(100), default=lambda: datetime.utcnow().isoformat())
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Início/fim nativos; date/time continuam sendo gravados (escrita dupla)
+    start_at = db.Column(db.DateTime)
+    end_at = db.Column(db.DateTime)
+    
     # Campos legados para compatibilidade
     barbeiro = db.Column(db.String(150))
     barbeiro_id = db.Column(db.Integer)
+    
+    # Índices dos caminhos quentes (mantidos também pelas migrações 0001 a 0003)
+    __table_args__ = (
+        db.Index('idx_appointments_barbeiro_date', 'barbeiro_id', 'date', 'time'),
+        db.Index('idx_appointments_barbeiro_nome', 'barbeiro', 'date'),
+        db.Index('idx_appointments_cliente_email', 'cliente_email', 'date'),
+        db.Index('idx_appointments_cliente_id', 'cliente_id', 'date'),
+        db.Index('idx_appointments_status_date', 'status', 'date', 'time'),
+        db.Index('idx_appointments_barbeiro_start', 'barbeiro_id', 'start_at'),
+        db.Index('idx_appointments_cliente_start', 'cliente_id', 'start_at'),
+        db.Index('idx_appointments_status_start', 'status', 'start_at'),
+        db.Index('idx_appointments_cliente_email_start', 'cliente_email', 'start_at'),
+        db.Index('idx_appointments_barbeiro_nome_start', 'barbeiro', 'start_at'),
+    )
 
     def to_dict(self):
         return {
@@ -160,12 +238,86 @@ class Appointment(db.Model):
             "observacoes": self.observacoes,
             "cancelamento_motivo": self.cancelamento_motivo,
             "created_at": self.created_at,
+            "start_at": self.start_at.isoformat() if self.start_at else None,
+            "end_at": self.end_at.isoformat() if self.end_at else None,
             # Campos legados para compatibilidade
             "barbeiro": self.profissional or self.barbeiro,
             "barbeiro_id": self.profissional_id or self.barbeiro_id,
         }
 
 
+@event.listens_for(Appointment, "before_insert")
+@event.listens_for(Appointment, "before_update")
+def _sync_appointment_bounds(mapper, connection, target):
+    """Mantém start_at/end_at coerentes com date/time em qualquer escrita pelo ORM."""
+    state = inspect(target)
+    changed = (state.attrs.date.history.has_changes()
+               or state.attrs.time.history.has_changes())
+    if target.start_at is not None and not changed:
+        return
+
+    # Reagendamento preserva a duração já registrada
+    duracao = None
+    if target.start_at and target.end_at:
+        duracao = int((target.end_at - target.start_at).total_seconds() // 60)
+
+    start_at, end_at = appointment_bounds(target.date, target.time, duracao)
+    if start_at is not None:
+        target.start_at, target.end_at = start_at, end_at
+
+
+class AppointmentSlotClaim(db.Model):
+    """Blocos de agenda reservados por agendamentos ativos e por bloqueios.
+
+    A chave primária (barbeiro_id, slot_start) é a garantia de não haver dois
+    agendamentos sobrepostos: a reserva entra na mesma transação do
+    agendamento e um bloco já tomado faz o INSERT falhar. Bloqueios
+    (BlockedTime) reservam os seus blocos com appointment_id
+    "bloqueio:<id>", então o mesmo INSERT também recusa horários bloqueados.
+    """
+    __tablename__ = "appointment_slot_claims"
+    barbeiro_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    slot_start = db.Column(db.DateTime, primary_key=True)
+    appointment_id = db.Column(db.String(50), nullable=False)
+
+    __table_args__ = (
+        db.Index('idx_slot_claims_appointment', 'appointment_id'),
+    )
+
+
+class CalendarFeedToken(db.Model):
+    """Segredo do link do feed iCalendar de cada profissional.
+
+    Aleatório e independente da chave de sessão; gerar um novo revoga o
+    link anterior. Sem registro, o feed do profissional não é servido.
+    """
+    __tablename__ = "calendar_feed_tokens"
+    profissional_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    token = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class AppointmentDailyStat(db.Model):
+    """Contagem de agendamentos por profissional, cliente, dia, hora, serviço e status.
+
+    Tabela de fatos dos gráficos de analytics, mantida incrementalmente na
+    mesma transação de cada escrita em appointments (ver daily_stats.py).
+    Ids ausentes são gravados como 0 e status ausente como ''.
+    """
+    __tablename__ = "appointment_daily_stats"
+    barbeiro_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    hour = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    cliente_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    servico_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    status = db.Column(db.String(50), primary_key=True)
+    appointments = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('idx_daily_stats_cliente', 'cliente_id', 'day'),
+    )
+
+
 class Product(db.Model):
     __tablename__ = "products"
     id = db.Column(db.Integer, primary_key=True)
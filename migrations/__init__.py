@@ -0,0 +1,47 @@
+"""Migrações versionadas do banco de dados.
+
+Cada migração é um módulo ``mNNNN_*.py`` com ``VERSION``, ``DESCRIPTION``,
+``upgrade(conn, cursor)`` e, opcionalmente, ``INDEXES`` (usado pela
+verificação de índices). As versões aplicadas ficam em ``schema_migrations``.
+
+Uso: ``python -m migrations [upgrade|status|verify|explain|rebuild-stats]``
+"""
+from . import m0001_appointment_indexes
+from . import m0002_appointment_datetimes
+from . import m0003_appointment_keyset_indexes
+from . import m0004_appointment_slot_claims
+from . import m0005_appointment_daily_stats
+from . import m0006_calendar_feed_tokens
+from . import m0007_block_slot_claims
+from . import runner
+from .hot_queries import HOT_QUERIES, register_hot_query, check_hot_queries
+
+MIGRATIONS = [
+    m0001_appointment_indexes,
+    m0002_appointment_datetimes,
+    m0003_appointment_keyset_indexes,
+    m0004_appointment_slot_claims,
+    m0005_appointment_daily_stats,
+    m0006_calendar_feed_tokens,
+    m0007_block_slot_claims,
+]
+
+
+def run_migrations():
+    """Aplica as migrações pendentes."""
+    return runner.run_migrations(MIGRATIONS)
+
+
+def verify_indexes():
+    """Lista índices declarados que estão ausentes ou diferentes no banco."""
+    return runner.verify_indexes(MIGRATIONS)
+
+
+__all__ = [
+    'MIGRATIONS',
+    'HOT_QUERIES',
+    'run_migrations',
+    'verify_indexes',
+    'register_hot_query',
+    'check_hot_queries',
+]
@@ -0,0 +1,82 @@
+"""Linha de comando das migrações: python -m migrations [upgrade|status|verify|explain|rebuild-stats]"""
+import sys
+
+import daily_stats
+from database_config import get_pool
+from . import MIGRATIONS, run_migrations, verify_indexes, check_hot_queries
+from .runner import get_applied_versions
+
+
+def status():
+    conn = get_pool().acquire()
+    cursor = conn.cursor()
+    try:
+        applied = get_applied_versions(cursor)
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    for migration in MIGRATIONS:
+        mark = '✅' if migration.VERSION in applied else '⏳'
+        print(f"{mark} {migration.VERSION:04d} {migration.DESCRIPTION}")
+    return 0
+
+
+def upgrade():
+    applied = run_migrations()
+    print(f"✅ {len(applied)} migração(ões) aplicada(s)")
+    return 0
+
+
+def verify():
+    problems = verify_indexes()
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Todos os índices declarados existem")
+    return 1 if problems else 0
+
+
+def explain():
+    failures = check_hot_queries()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Nenhuma consulta quente faz varredura completa")
+    return 1 if failures else 0
+
+
+def rebuild_stats():
+    """Recalcula appointment_daily_stats a partir de appointments (carga ou correção)."""
+    conn = get_pool().acquire()
+    cursor = conn.cursor()
+    try:
+        rows = daily_stats.rebuild(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+    print(f"✅ appointment_daily_stats recalculada: {rows} linha(s)")
+    return 0
+
+
+COMMANDS = {
+    'upgrade': upgrade,
+    'status': status,
+    'verify': verify,
+    'explain': explain,
+    'rebuild-stats': rebuild_stats,
+}
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'upgrade'
+    if command not in COMMANDS:
+        print(f"Uso: python -m migrations [{'|'.join(COMMANDS)}]")
+        sys.exit(2)
+    sys.exit(COMMANDS[command]())
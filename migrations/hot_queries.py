@@ -0,0 +1,96 @@
+"""Consultas quentes verificadas com EXPLAIN.
+
+Cada consulta registrada aqui precisa ser atendida por um índice; a
+verificação falha se o plano de alguma delas cair em varredura completa
+(``type = ALL``) de uma tabela.
+"""
+from database_config import get_pool
+
+HOT_QUERIES = []
+
+
+def register_hot_query(name, sql, params=()):
+    """Registra uma consulta (com parâmetros de exemplo) para a verificação com EXPLAIN."""
+    HOT_QUERIES.append({'name': name, 'sql': sql, 'params': tuple(params)})
+
+
+register_hot_query(
+    'list_appointments_for_barber',
+    "SELECT * FROM appointments WHERE barbeiro_id = %s AND date = %s",
+    (1, '2025-01-01'),
+)
+register_hot_query(
+    'list_appointments_for_user (barbeiro)',
+    "SELECT * FROM appointments WHERE barbeiro = %s",
+    ('Barbeiro',),
+)
+register_hot_query(
+    'list_appointments_for_user (cliente)',
+    "SELECT * FROM appointments WHERE cliente_email = %s",
+    ('cliente@example.com',),
+)
+register_hot_query(
+    'página de agendamentos do cliente (keyset)',
+    "SELECT * FROM appointments WHERE cliente_email = %s AND (start_at, id) > (%s, %s) "
+    "ORDER BY start_at, id LIMIT 21",
+    ('cliente@example.com', '2025-01-01 00:00:00', ''),
+)
+register_hot_query(
+    'auto_complete_past_appointments',
+    "SELECT id FROM appointments WHERE status = %s AND start_at < %s",
+    ('agendado', '2025-01-01 12:00:00'),
+)
+register_hot_query(
+    'próximos agendamentos do barbeiro',
+    "SELECT COUNT(*) as total FROM appointments WHERE barbeiro_id = %s AND status = %s AND start_at >= NOW()",
+    (1, 'agendado'),
+)
+register_hot_query(
+    'agendamentos dos últimos 30 dias',
+    "SELECT day as date, SUM(appointments) as count FROM appointment_daily_stats "
+    "WHERE cliente_id = %s AND day >= %s GROUP BY day",
+    (1, '2025-01-01'),
+)
+register_hot_query(
+    'horários de pico do barbeiro',
+    "SELECT hour, SUM(appointments) as count FROM appointment_daily_stats "
+    "WHERE barbeiro_id = %s GROUP BY hour",
+    (1,),
+)
+register_hot_query(
+    'get_client_stats',
+    "SELECT COUNT(*) as total FROM appointments WHERE cliente_id = %s",
+    (1,),
+)
+register_hot_query(
+    'get_barber_stats',
+    "SELECT COUNT(*) as total FROM appointments WHERE barbeiro_id = %s",
+    (1,),
+)
+
+
+def check_hot_queries(queries=None):
+    """Executa EXPLAIN em cada consulta registrada.
+
+    Retorna a lista de falhas (vazia quando todas usam índice). Observação:
+    em tabelas quase vazias o otimizador pode preferir a varredura completa;
+    rode a verificação contra uma base com volume realista.
+    """
+    conn = get_pool().acquire()
+    cursor = conn.cursor()
+    failures = []
+
+    try:
+        for query in queries or HOT_QUERIES:
+            cursor.execute("EXPLAIN " + query['sql'], query['params'])
+            for row in cursor.fetchall():
+                if (row.get('type') or '').upper() == 'ALL':
+                    failures.append(
+                        f"{query['name']}: varredura completa em '{row.get('table')}' "
+                        f"(possible_keys={row.get('possible_keys')})"
+                    )
+        return failures
+
+    finally:
+        cursor.close()
+        conn.close()
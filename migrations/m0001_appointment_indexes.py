@@ -0,0 +1,24 @@
+"""Índices compostos para os caminhos quentes da tabela de agendamentos."""
+from .runner import create_index_if_missing
+
+VERSION = 1
+DESCRIPTION = 'Índices compostos de appointments'
+
+# (tabela, nome do índice, colunas) - os nomes coincidem com os de db.Appointment
+INDEXES = [
+    # list_appointments_for_barber e verificação de conflito (barbeiro + data + hora)
+    ('appointments', 'idx_appointments_barbeiro_date', ('barbeiro_id', 'date', 'time')),
+    # list_appointments_for_user (barbeiro logado filtra pelo nome)
+    ('appointments', 'idx_appointments_barbeiro_nome', ('barbeiro', 'date')),
+    # list_appointments_for_user (cliente)
+    ('appointments', 'idx_appointments_cliente_email', ('cliente_email', 'date')),
+    # Estatísticas e avaliações do cliente
+    ('appointments', 'idx_appointments_cliente_id', ('cliente_id', 'date')),
+    # auto_complete_past_appointments (status + data/hora)
+    ('appointments', 'idx_appointments_status_date', ('status', 'date', 'time')),
+]
+
+
+def upgrade(conn, cursor):
+    for table, index_name, columns in INDEXES:
+        create_index_if_missing(cursor, table, index_name, columns)
@@ -0,0 +1,70 @@
+"""Colunas DATETIME nativas (start_at/end_at) em appointments, com backfill em lotes."""
+from .runner import column_exists, create_index_if_missing
+
+VERSION = 2
+DESCRIPTION = 'start_at/end_at DATETIME em appointments'
+
+BATCH_SIZE = 1000
+
+INDEXES = [
+    # Próximos agendamentos / últimos N dias do barbeiro
+    ('appointments', 'idx_appointments_barbeiro_start', ('barbeiro_id', 'start_at')),
+    # Próximos agendamentos / últimos N dias do cliente
+    ('appointments', 'idx_appointments_cliente_start', ('cliente_id', 'start_at')),
+    # auto_complete_past_appointments
+    ('appointments', 'idx_appointments_status_start', ('status', 'start_at')),
+]
+
+
+def backfill(conn, cursor, batch_size=BATCH_SIZE):
+    """Preenche start_at/end_at a partir de date/time, em lotes paginados pelo id.
+
+    Linhas com data/hora fora do formato ficam com NULL (e não travam o laço).
+    A duração vem do preço personalizado do profissional, do serviço ou 30 min.
+    """
+    last_id = ''
+    total = 0
+
+    while True:
+        cursor.execute("""
+            SELECT id FROM appointments
+            WHERE start_at IS NULL AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (last_id, batch_size))
+        ids = [row['id'] for row in cursor.fetchall()]
+        if not ids:
+            break
+
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            UPDATE appointments a
+            LEFT JOIN services s ON s.id = a.servico_id
+            LEFT JOIN professional_prices pp
+                ON pp.profissional_id = a.barbeiro_id AND pp.servico_id = a.servico_id
+            SET a.start_at = STR_TO_DATE(CONCAT(a.date, ' ', LEFT(a.time, 5)), '%%Y-%%m-%%d %%H:%%i'),
+                a.end_at = STR_TO_DATE(CONCAT(a.date, ' ', LEFT(a.time, 5)), '%%Y-%%m-%%d %%H:%%i')
+                    + INTERVAL COALESCE(pp.duracao_customizada, s.duracao, 30) MINUTE
+            WHERE a.id IN ({placeholders})
+            AND a.date REGEXP '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}$'
+            AND a.time REGEXP '^[0-9]{{2}}:[0-9]{{2}}'
+        """, ids)
+        conn.commit()
+
+        total += cursor.rowcount
+        last_id = ids[-1]
+
+    print(f"   ↳ {total} agendamento(s) preenchido(s)")
+    return total
+
+
+def upgrade(conn, cursor):
+    if not column_exists(cursor, 'appointments', 'start_at'):
+        cursor.execute("ALTER TABLE appointments ADD COLUMN start_at DATETIME NULL")
+    if not column_exists(cursor, 'appointments', 'end_at'):
+        cursor.execute("ALTER TABLE appointments ADD COLUMN end_at DATETIME NULL")
+
+    for table, index_name, columns in INDEXES:
+        create_index_if_missing(cursor, table, index_name, columns)
+
+    backfill(conn, cursor)
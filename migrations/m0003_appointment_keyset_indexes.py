@@ -0,0 +1,17 @@
+"""Índices para a paginação por cursor (start_at, id) das listagens de agendamentos."""
+from .runner import create_index_if_missing
+
+VERSION = 3
+DESCRIPTION = 'Índices de paginação keyset em appointments'
+
+# O InnoDB acrescenta a chave primária (id) ao fim de cada índice secundário,
+# então (coluna, start_at) atende ORDER BY start_at, id e o filtro do cursor.
+INDEXES = [
+    ('appointments', 'idx_appointments_cliente_email_start', ('cliente_email', 'start_at')),
+    ('appointments', 'idx_appointments_barbeiro_nome_start', ('barbeiro', 'start_at')),
+]
+
+
+def upgrade(conn, cursor):
+    for table, index_name, columns in INDEXES:
+        create_index_if_missing(cursor, table, index_name, columns)
@@ -0,0 +1,47 @@
+"""Reserva de blocos de agenda (appointment_slot_claims) para agendamento sem sobreposição."""
+from datetime import datetime
+
+from db import slot_claim_starts, FREE_STATUSES
+from .runner import table_exists
+
+VERSION = 4
+DESCRIPTION = 'Tabela appointment_slot_claims com reservas dos agendamentos futuros'
+
+INDEXES = [
+    ('appointment_slot_claims', 'idx_slot_claims_appointment', ('appointment_id',)),
+]
+
+
+def upgrade(conn, cursor):
+    if not table_exists(cursor, 'appointment_slot_claims'):
+        cursor.execute("""
+            CREATE TABLE appointment_slot_claims (
+                barbeiro_id INT NOT NULL,
+                slot_start DATETIME NOT NULL,
+                appointment_id VARCHAR(50) NOT NULL,
+                PRIMARY KEY (barbeiro_id, slot_start),
+                KEY idx_slot_claims_appointment (appointment_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+
+    # Só o futuro precisa de proteção; reservas passadas são limpas pelo agendador
+    placeholders = ', '.join(['%s'] * len(FREE_STATUSES))
+    cursor.execute(f"""
+        SELECT id, barbeiro_id, start_at, end_at FROM appointments
+        WHERE start_at >= %s AND barbeiro_id IS NOT NULL AND end_at IS NOT NULL
+        AND status NOT IN ({placeholders})
+        ORDER BY start_at, id
+    """, (datetime.now(), *FREE_STATUSES))
+
+    claims = [
+        (row['barbeiro_id'], slot, row['id'])
+        for row in cursor.fetchall()
+        for slot in slot_claim_starts(row['start_at'], row['end_at'])
+    ]
+    # Agendamentos duplicados de antes desta migração: o primeiro fica com o bloco
+    cursor.executemany("""
+        INSERT IGNORE INTO appointment_slot_claims (barbeiro_id, slot_start, appointment_id)
+        VALUES (%s, %s, %s)
+    """, claims)
+    conn.commit()
+    print(f"   ↳ {len(claims)} bloco(s) reservado(s)")
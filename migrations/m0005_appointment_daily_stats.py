@@ -0,0 +1,31 @@
+"""Tabela de fatos appointment_daily_stats (gráficos de analytics), com carga inicial."""
+from daily_stats import rebuild
+from .runner import table_exists
+
+VERSION = 5
+DESCRIPTION = 'Tabela appointment_daily_stats com a contagem diária por hora, serviço e status'
+
+INDEXES = [
+    ('appointment_daily_stats', 'idx_daily_stats_cliente', ('cliente_id', 'day')),
+]
+
+
+def upgrade(conn, cursor):
+    if not table_exists(cursor, 'appointment_daily_stats'):
+        cursor.execute("""
+            CREATE TABLE appointment_daily_stats (
+                barbeiro_id INT NOT NULL,
+                day DATE NOT NULL,
+                hour SMALLINT NOT NULL,
+                cliente_id INT NOT NULL,
+                servico_id INT NOT NULL,
+                status VARCHAR(50) NOT NULL,
+                appointments INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (barbeiro_id, day, hour, cliente_id, servico_id, status),
+                KEY idx_daily_stats_cliente (cliente_id, day)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+
+    rows = rebuild(cursor)
+    conn.commit()
+    print(f"   ↳ {rows} linha(s) em appointment_daily_stats")
@@ -0,0 +1,17 @@
+"""Tabela calendar_feed_tokens (segredo aleatório do feed iCalendar de cada profissional)."""
+from .runner import table_exists
+
+VERSION = 6
+DESCRIPTION = 'Tabela calendar_feed_tokens com o segredo do feed de calendário'
+
+
+def upgrade(conn, cursor):
+    if not table_exists(cursor, 'calendar_feed_tokens'):
+        cursor.execute("""
+            CREATE TABLE calendar_feed_tokens (
+                profissional_id INT NOT NULL PRIMARY KEY,
+                token VARCHAR(64) NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+        """)
+    conn.commit()
@@ -0,0 +1,29 @@
+"""Reservas de blocos dos bloqueios (BlockedTime) em appointment_slot_claims."""
+from datetime import date
+
+from db import block_bounds, block_claim_id, slot_claim_starts
+
+VERSION = 7
+DESCRIPTION = 'Bloqueios futuros reservam os seus blocos em appointment_slot_claims'
+
+
+def upgrade(conn, cursor):
+    cursor.execute("""
+        SELECT id, profissional_id, data, hora_inicio, hora_fim FROM blocked_times
+        WHERE data >= %s
+    """, (date.today().isoformat(),))
+
+    claims = []
+    for row in cursor.fetchall():
+        start_at, end_at = block_bounds(row['data'], row['hora_inicio'], row['hora_fim'])
+        if start_at is None or end_at <= start_at:
+            continue
+        claims.extend((row['profissional_id'], slot, block_claim_id(row['id']))
+                      for slot in slot_claim_starts(start_at, end_at))
+    # Blocos já reservados por agendamentos continuam com eles
+    cursor.executemany("""
+        INSERT IGNORE INTO appointment_slot_claims (barbeiro_id, slot_start, appointment_id)
+        VALUES (%s, %s, %s)
+    """, claims)
+    conn.commit()
+    print(f"   ↳ {len(claims)} bloco(s) reservado(s) por bloqueios")
@@ -0,0 +1,128 @@
+"""Execução e verificação das migrações versionadas do banco de dados."""
+from database_config import get_pool
+
+# Impede que dois workers apliquem migrações ao mesmo tempo
+MIGRATION_LOCK_NAME = 'corte_digital_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 60
+
+
+def ensure_migrations_table(cursor):
+    """Cria a tabela que registra as versões já aplicadas."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+
+
+def get_applied_versions(cursor):
+    """Retorna o conjunto de versões já aplicadas."""
+    ensure_migrations_table(cursor)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def table_exists(cursor, table):
+    cursor.execute("""
+        SELECT COUNT(*) as total FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return cursor.fetchone()['total'] > 0
+
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT COUNT(*) as total FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cursor.fetchone()['total'] > 0
+
+
+def get_index_columns(cursor, table, index_name):
+    """Colunas de um índice na ordem em que foram declaradas ([] se não existir)."""
+    cursor.execute("""
+        SELECT COLUMN_NAME as column_name FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+        ORDER BY SEQ_IN_INDEX
+    """, (table, index_name))
+    return [row['column_name'] for row in cursor.fetchall()]
+
+
+def create_index_if_missing(cursor, table, index_name, columns, unique=False):
+    """Cria o índice caso ainda não exista (db.create_all já pode tê-lo criado)."""
+    if get_index_columns(cursor, table, index_name):
+        return False
+
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    column_list = ', '.join(f'`{column}`' for column in columns)
+    cursor.execute(f"CREATE {kind} `{index_name}` ON `{table}` ({column_list})")
+    print(f"   + {index_name} ({', '.join(columns)})")
+    return True
+
+
+def run_migrations(migrations):
+    """Aplica, em ordem, as migrações ainda não registradas. Retorna as versões aplicadas."""
+    conn = get_pool().acquire()  # Conexão própria, fora do escopo da requisição
+    cursor = conn.cursor()
+    applied_now = []
+
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s) as locked", (MIGRATION_LOCK_NAME, MIGRATION_LOCK_TIMEOUT))
+        if not cursor.fetchone()['locked']:
+            raise RuntimeError("Não foi possível obter o lock de migrações")
+
+        try:
+            applied = get_applied_versions(cursor)
+            conn.commit()
+
+            for migration in sorted(migrations, key=lambda m: m.VERSION):
+                if migration.VERSION in applied:
+                    continue
+
+                print(f"🔧 Aplicando migração {migration.VERSION:04d}: {migration.DESCRIPTION}")
+                migration.upgrade(conn, cursor)
+                cursor.execute("""
+                    INSERT INTO schema_migrations (version, description)
+                    VALUES (%s, %s)
+                """, (migration.VERSION, migration.DESCRIPTION))
+                conn.commit()
+                applied_now.append(migration.VERSION)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATION_LOCK_NAME,))
+
+        return applied_now
+
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def verify_indexes(migrations):
+    """Confere se os índices declarados pelas migrações existem com as colunas esperadas.
+
+    Retorna uma lista de problemas encontrados (vazia quando está tudo certo).
+    """
+    conn = get_pool().acquire()
+    cursor = conn.cursor()
+    problems = []
+
+    try:
+        for migration in migrations:
+            for table, index_name, columns in getattr(migration, 'INDEXES', []):
+                existing = get_index_columns(cursor, table, index_name)
+                if not existing:
+                    problems.append(f"{table}.{index_name}: índice ausente")
+                elif existing != list(columns):
+                    problems.append(
+                        f"{table}.{index_name}: colunas {existing}, esperado {list(columns)}"
+                    )
+        return problems
+
+    finally:
+        cursor.close()
+        conn.close()
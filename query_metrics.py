@@ -0,0 +1,164 @@
+"""Contagem e tempo das consultas SQL por requisição.
+
+Instrumenta tanto o engine do SQLAlchemy quanto os cursores pymysql do pool
+(database_config). Ao final de cada requisição o total vai no cabeçalho
+``Server-Timing`` e, se o mesmo formato de consulta se repetir mais vezes
+que ``Config.QUERY_REPEAT_THRESHOLD``, um aviso de possível N+1 é registrado.
+"""
+import re
+import time
+from collections import Counter
+
+import pymysql
+from sqlalchemy import event
+
+from config import Config
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(sql):
+    """Normaliza a consulta: literais e parâmetros viram ``?`` e espaços são colapsados."""
+    shape = _STRING_LITERAL.sub('?', sql)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _IN_LIST.sub('(?)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class _RequestQueryStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = Counter()
+        self.reported = False
+
+
+def _current_stats(create=True):
+    from flask import g, has_app_context
+
+    if not has_app_context():
+        return None
+    stats = g.get('_query_stats')
+    if stats is None and create:
+        stats = g._query_stats = _RequestQueryStats()
+    return stats
+
+
+def record_query(sql, duration_ms):
+    """Registra uma consulta na requisição atual (ignorado fora de um contexto Flask)."""
+    if not Config.QUERY_METRICS_ENABLED:
+        return
+    stats = _current_stats()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.total_ms += duration_ms
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    stats.shapes[statement_shape(sql)] += 1
+
+
+def get_request_query_stats():
+    """Totais da requisição atual: {'count', 'total_ms', 'repeated'}."""
+    stats = _current_stats(create=False)
+    if stats is None:
+        return {'count': 0, 'total_ms': 0.0, 'repeated': []}
+    threshold = Config.QUERY_REPEAT_THRESHOLD
+    return {
+        'count': stats.count,
+        'total_ms': round(stats.total_ms, 3),
+        'repeated': [(shape, n) for shape, n in stats.shapes.most_common() if n > threshold],
+    }
+
+
+class InstrumentedCursorMixin:
+    """Mede ``execute``/``executemany`` dos cursores pymysql."""
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            record_query(query, (time.perf_counter() - started) * 1000)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, args)
+        finally:
+            record_query(query, (time.perf_counter() - started) * 1000)
+
+
+class InstrumentedDictCursor(InstrumentedCursorMixin, pymysql.cursors.DictCursor):
+    """DictCursor padrão das conexões do pool, com métricas."""
+
+
+class InstrumentedSSDictCursor(InstrumentedCursorMixin, pymysql.cursors.SSDictCursor):
+    """Cursor no servidor (sem buffer) com métricas."""
+
+
+def instrument_engine(engine):
+    """Conecta os eventos de execução do engine SQLAlchemy às métricas da requisição."""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['_query_started'].pop()
+        record_query(statement, (time.perf_counter() - started) * 1000)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('_query_started'):
+            connection.info['_query_started'].pop()
+
+
+def _warn_repeated(app, stats, where):
+    threshold = Config.QUERY_REPEAT_THRESHOLD
+    for shape, n in stats.shapes.most_common():
+        if n <= threshold:
+            break
+        app.logger.warning(
+            f"⚠️  Possível N+1 em {where}: consulta repetida {n}x: {shape[:200]}"
+        )
+
+
+def init_app(app):
+    """Registra o cabeçalho Server-Timing e o detector de N+1."""
+
+    @app.after_request
+    def _add_server_timing(response):
+        from flask import request
+
+        stats = _current_stats(create=False)
+        if stats is None or stats.reported:
+            return response
+        stats.reported = True
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={stats.total_ms:.1f};desc="{stats.count} queries"'
+        )
+        _warn_repeated(app, stats, f"{request.method} {request.path}")
+        return response
+
+    @app.teardown_request
+    def _report_event_queries(exc):
+        # Eventos Socket.IO não passam por after_request
+        from flask import request
+
+        stats = _current_stats(create=False)
+        if stats is None or stats.reported:
+            return
+        stats.reported = True
+
+        event_name = (getattr(request, 'event', None) or {}).get('message')
+        _warn_repeated(app, stats, f"evento {event_name}" if event_name else request.path)
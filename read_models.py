@@ -0,0 +1,81 @@
+"""Modelos de leitura enxutos para listagens.
+
+As listagens não precisam das entidades completas: selecionam só as colunas
+exibidas (sem senha, bio e os JSON em LONGTEXT de portfólio/disponibilidade)
+e mapeiam cada linha para um objeto com ``__slots__``, sem passar pelo
+identity map da sessão do SQLAlchemy.
+"""
+import json
+
+from db import db, Professional, Cliente
+
+
+class ReadModel:
+    """Base dos modelos de leitura: ``_columns`` na mesma ordem de ``__slots__``."""
+    __slots__ = ()
+    _columns = ()
+
+    def __init__(self, row):
+        for name, value in zip(self.__slots__, row):
+            setattr(self, name, value)
+
+    @classmethod
+    def select(cls, *criteria, order_by=None):
+        """Executa a projeção e retorna uma lista de instâncias do modelo de leitura."""
+        stmt = db.select(*cls._columns)
+        if criteria:
+            stmt = stmt.where(*criteria)
+        if order_by is not None:
+            stmt = stmt.order_by(order_by)
+        return [cls(row) for row in db.session.execute(stmt)]
+
+
+class ProfessionalSummary(ReadModel):
+    """Profissional para listagens (cards de escolha do profissional)."""
+    __slots__ = ('id', 'nome', 'foto', 'categoria', 'especialidades',
+                 'avaliacao', 'total_avaliacoes', 'preco_base', 'ativo')
+    _columns = (Professional.id, Professional.nome, Professional.foto, Professional.categoria,
+                Professional.especialidades, Professional.avaliacao,
+                Professional.total_avaliacoes, Professional.preco_base, Professional.ativo)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "nome": self.nome,
+            "name": self.nome,
+            "foto": self.foto,
+            "categoria": self.categoria,
+            "especialidades": json.loads(self.especialidades or "[]"),
+            "avaliacao": self.avaliacao,
+            "total_avaliacoes": self.total_avaliacoes,
+            "preco_base": self.preco_base,
+            "ativo": self.ativo,
+            "tipo": "profissional"
+        }
+
+
+class ContactSummary(ReadModel):
+    """Usuário (cliente ou profissional) para listas de contatos do chat."""
+    __slots__ = ('id', 'nome', 'email')
+
+    @classmethod
+    def select_from(cls, model, *criteria):
+        stmt = db.select(model.id, model.nome, model.email).order_by(model.nome)
+        if criteria:
+            stmt = stmt.where(*criteria)
+        return [cls(row) for row in db.session.execute(stmt)]
+
+    def to_dict(self):
+        return {"id": self.id, "nome": self.nome, "email": self.email}
+
+
+def list_professional_summaries(*criteria):
+    """Profissionais projetados para listagem, em ordem de id."""
+    return ProfessionalSummary.select(*criteria, order_by=Professional.id)
+
+
+def list_contacts(tipo, exclude_id=None):
+    """Contatos do chat: profissionais (tipo 'barbeiro') ou clientes, por nome."""
+    model = Professional if tipo == 'barbeiro' else Cliente
+    criteria = [model.id != exclude_id] if exclude_id is not None else []
+    return ContactSummary.select_from(model, *criteria)
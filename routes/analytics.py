@@ -32,6 +32,33 @@ def get_dashboard():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@analytics_bp.route('/bundle', methods=['GET'])
+def get_bundle():
+    """Vários widgets do dashboard numa única resposta (?widgets=dashboard,peak-hours&period=month)"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Não autenticado'}), 401
+    
+    from flask import request
+    widgets = [name.strip() for name in request.args.get('widgets', '').split(',') if name.strip()]
+    if not widgets:
+        widgets = list(analytics_service.WIDGETS)
+    
+    try:
+        bundle = analytics_service.get_dashboard_bundle(
+            session['user_id'], session['tipo'], widgets, request.args.get('period', 'month')
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+    
+    return jsonify({
+        'success': True,
+        'data': bundle['data'],
+        'errors': bundle['errors']
+    })
+
+
 @analytics_bp.route('/appointments-chart', methods=['GET'])
 def get_appointments_chart():
     """Dados para gráfico de agendamentos"""
@@ -43,13 +70,16 @@ def get_appointments_chart():
         user_id = session['user_id']
         user_type = session['tipo']
         period = request.args.get('period', 'month')
+        bucket = request.args.get('bucket')
         
-        data = analytics_service.get_appointments_chart_data(user_id, user_type, period)
+        data = analytics_service.get_appointments_chart_data(user_id, user_type, period, bucket)
         
         return jsonify({
             'success': True,
             'data': data
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -67,13 +97,16 @@ def get_revenue_chart():
         from flask import request
         user_id = session['user_id']
         period = request.args.get('period', 'month')
+        bucket = request.args.get('bucket')
         
-        data = analytics_service.get_revenue_chart_data(user_id, period)
+        data = analytics_service.get_revenue_chart_data(user_id, period, bucket)
         
         return jsonify({
             'success': True,
             'data': data
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -1,9 +1,12 @@
 """Rotas de agendamentos."""
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, session
 from datetime import datetime
 from services import (exigir_login, list_appointments_for_user, create_appointment,
                       cancel_appointment_by_id, update_appointment_status, usuario_atual,
-                      list_appointments_for_barber)
+                      list_appointments_for_barber, list_appointments_page_for_user,
+                      list_appointments_page_for_barber, SlotUnavailableError,
+                      create_appointment_series, series_occurrences)
+from config import Config
 
 appointments_bp = Blueprint("appointments", __name__, url_prefix="/api/appointments")
 
@@ -23,6 +26,36 @@ def validate_datetime(date_str, time_str):
         return "Data ou horário inválido"
 
 
+def wants_page():
+    """A paginação por cursor é usada quando ?limit= ou ?cursor= são informados."""
+    return "limit" in request.args or "cursor" in request.args
+
+
+def page_args():
+    """Lê limit, cursor, direction (asc/desc), status (lista separada por vírgula) e total."""
+    status = request.args.get("status")
+    return {
+        "limit": request.args.get("limit", type=int),
+        "cursor": request.args.get("cursor") or None,
+        "direction": "desc" if request.args.get("direction") == "desc" else "asc",
+        "status": [s for s in status.split(",") if s] if status else None,
+        "include_total": request.args.get("total", "true").lower() not in ("0", "false", "no"),
+    }
+
+
+def page_response(page):
+    return jsonify({
+        "success": True,
+        "data": page["data"],
+        "pagination": {
+            "limit": page["limit"],
+            "next_cursor": page["next_cursor"],
+            "has_more": page["has_more"],
+            "total": page["total"]
+        }
+    })
+
+
 
 
 
@@ -32,6 +65,11 @@ def appointments_root():
         return jsonify({"success": False, "message": "Não autenticado"}), 401
 
     if request.method == "GET":
+        if wants_page():
+            try:
+                return page_response(list_appointments_page_for_user(**page_args()))
+            except ValueError as e:
+                return jsonify({"success": False, "message": str(e)}), 400
         return jsonify({"success": True, "data": list_appointments_for_user()})
 
     # POST - Criar agendamento
@@ -40,25 +78,76 @@ def appointments_root():
     if not all(body.get(f) for f in required):
         return jsonify({"success": False, "message": "Dados incompletos"}), 400
 
-    barber_id, date, time = int(body["barberId"]), body["date"], body["time"]
-    
+    if not str(body["barberId"]).isdigit():
+        return jsonify({"success": False, "message": "Profissional inválido"}), 400
+
     # Validar data/hora
-    error = validate_datetime(date, time)
+    error = validate_datetime(body["date"], body["time"])
     if error:
         return jsonify({"success": False, "message": error}), 400
 
-    # Verificar conflito
-    existing = [a for a in list_appointments_for_barber(barber_id, date)
-                if a.get("time") == time and a.get("status") != "cancelado"]
-    if existing:
-        return jsonify({"success": False, "message": "Horário já agendado"}), 409
-
-    # Criar agendamento
-    novo = create_appointment(body)
+    # Criar agendamento: a reserva dos blocos no banco é a verificação de conflito
+    try:
+        novo = create_appointment(body)
+    except SlotUnavailableError as e:
+        return jsonify({"success": False, "message": str(e)}), 409
     
     return jsonify({"success": True, "data": novo}), 201
 
 
+@appointments_bp.post("/series")
+def appointments_series():
+    """Agendamento recorrente (date/time + every_weeks/count) ou em lote (occurrences: [{date, time}]).
+
+    Responde 201 com o relatório por ocorrência se ao menos uma foi criada;
+    409 se nenhuma foi (ou se ``skip_conflicts`` for false e houver conflito).
+    """
+    if not exigir_login():
+        return jsonify({"success": False, "message": "Não autenticado"}), 401
+
+    body = request.get_json() or {}
+    required = ["barberId", "barberName", "serviceId", "serviceName"]
+    if not all(body.get(f) for f in required):
+        return jsonify({"success": False, "message": "Dados incompletos"}), 400
+    if not str(body["barberId"]).isdigit():
+        return jsonify({"success": False, "message": "Profissional inválido"}), 400
+
+    limit = Config.MAX_SERIES_OCCURRENCES
+    limit_message = f"Informe de 1 a {limit} ocorrências"
+    try:
+        if body.get("occurrences"):
+            # Limite checado antes de montar qualquer coisa
+            if not isinstance(body["occurrences"], list) or len(body["occurrences"]) > limit:
+                return jsonify({"success": False, "message": limit_message}), 400
+            occurrences = [(o["date"], o["time"]) for o in body["occurrences"]]
+        else:
+            every_weeks, count = int(body.get("every_weeks", 1)), int(body.get("count", 1))
+            if not 0 < count <= limit:
+                return jsonify({"success": False, "message": limit_message}), 400
+            if every_weeks < 1:
+                return jsonify({"success": False, "message": "every_weeks deve ser no mínimo 1"}), 400
+            occurrences = series_occurrences(body["date"], body["time"], every_weeks, count)
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return jsonify({"success": False, "message": "Ocorrências inválidas"}), 400
+
+    if not occurrences:
+        return jsonify({"success": False, "message": limit_message}), 400
+
+    # Só booleano JSON: "false" ou 0 não podem virar reserva parcial por acidente
+    skip_conflicts = body.get("skip_conflicts", True)
+    if not isinstance(skip_conflicts, bool):
+        return jsonify({"success": False, "message": "skip_conflicts deve ser true ou false"}), 400
+
+    try:
+        result = create_appointment_series(body, occurrences, skip_conflicts=skip_conflicts)
+    except SlotUnavailableError as e:
+        return jsonify({"success": False, "message": str(e)}), 409
+
+    if not result["created"]:
+        return jsonify({"success": False, "message": "Nenhum horário disponível", "data": result}), 409
+    return jsonify({"success": True, "data": result}), 201
+
+
 @appointments_bp.delete("/<appointment_id>")
 def cancel_appointment(appointment_id: str):
     if not exigir_login():
@@ -78,7 +167,11 @@ def update_status(appointment_id: str):
     if not status:
         return jsonify({"success": False, "message": "Status obrigatório"}), 400
 
-    if not update_appointment_status(appointment_id, status):
+    try:
+        updated = update_appointment_status(appointment_id, status)
+    except SlotUnavailableError as e:
+        return jsonify({"success": False, "message": str(e)}), 409
+    if not updated:
         return jsonify({"success": False, "message": "Agendamento não encontrado"}), 404
     
     return jsonify({"success": True})
@@ -89,6 +182,13 @@ def appointments_for_barber(barber_id: int):
     if not exigir_login():
         return jsonify({"success": False, "message": "Não autenticado"}), 401
     
+    if wants_page():
+        try:
+            page = list_appointments_page_for_barber(barber_id, request.args.get('date'), **page_args())
+        except ValueError as e:
+            return jsonify({"success": False, "message": str(e)}), 400
+        return page_response(page)
+    
     data = list_appointments_for_barber(barber_id, request.args.get('date'))
     return jsonify({"success": True, "data": data})
 
@@ -107,3 +207,35 @@ def auto_complete():
         "message": f"{updated_count} agendamento(s) marcado(s) como concluído(s)",
         "updated_count": updated_count
     })
+
+
+@appointments_bp.get('/export')
+def export_appointments():
+    """Exporta o histórico do barbeiro logado em CSV ou NDJSON (streaming).
+    
+    Filtros: ?format=csv|ndjson&from=YYYY-MM-DD&to=YYYY-MM-DD&status=a,b
+    """
+    if not exigir_login("barbeiro"):
+        return jsonify({"success": False, "message": "Apenas barbeiros"}), 401
+    
+    from services.export_service import open_appointments_export
+    
+    fmt = request.args.get("format", "csv")
+    status = request.args.get("status")
+    try:
+        stream = open_appointments_export(
+            session.get("user_id"),
+            date_from=request.args.get("from"),
+            date_to=request.args.get("to"),
+            statuses=[s for s in status.split(",") if s] if status else None,
+            fmt=fmt
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    
+    mimetype = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    filename = f"agendamentos.{'csv' if fmt == 'csv' else 'ndjson'}"
+    return Response(stream, mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename={filename}",
+        "X-Accel-Buffering": "no"
+    })
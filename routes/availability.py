@@ -0,0 +1,48 @@
+"""Rotas de disponibilidade de horários."""
+from flask import Blueprint, jsonify, request
+
+from config import Config
+from services import availability_service
+
+availability_bp = Blueprint("availability", __name__, url_prefix="/api/availability")
+
+
+@availability_bp.get("/first")
+def primeiro_disponivel():
+    """Primeiros horários livres com qualquer profissional: ?service_id=&limit=&days=&date=."""
+    service_id = request.args.get("service_id", type=int)
+    if not service_id:
+        return jsonify({"success": False, "message": "service_id é obrigatório"}), 400
+
+    limit = max(1, min(request.args.get("limit", 5, type=int), Config.FIRST_AVAILABLE_MAX_RESULTS))
+    try:
+        data = availability_service.find_first_available(
+            service_id,
+            limit=limit,
+            date_from=request.args.get("date"),
+            days=request.args.get("days", type=int),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"success": False, "message": str(e)}), 404
+
+    return jsonify({"success": True, "data": data})
+
+
+@availability_bp.get("/<int:barber_id>")
+def disponibilidade(barber_id):
+    """Horários de um profissional (livres e grade com status): ?service_id=&date=YYYY-MM-DD&date_to=YYYY-MM-DD."""
+    try:
+        data = availability_service.get_availability(
+            barber_id,
+            service_id=request.args.get("service_id", type=int),
+            date_from=request.args.get("date"),
+            date_to=request.args.get("date_to"),
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except LookupError as e:
+        return jsonify({"success": False, "message": str(e)}), 404
+
+    return jsonify({"success": True, "data": data})
@@ -104,10 +104,10 @@ def get_all_barbers_prices():
     if not exigir_login():
         return jsonify({"success": False, "message": "Não autenticado"}), 401
     
-    from db import Barber
+    from read_models import list_professional_summaries
     
-    # Buscar todos os barbeiros
-    barbeiros = Barber.query.all()
+    # Buscar todos os barbeiros (apenas as colunas exibidas)
+    barbeiros = list_professional_summaries()
     
     result = []
     for barbeiro in barbeiros:
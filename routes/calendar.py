@@ -0,0 +1,54 @@
+"""Rotas do feed de calendário (iCalendar) dos profissionais."""
+from flask import Blueprint, Response, jsonify, request, session, url_for
+
+from db import db, Professional
+from services import exigir_login
+from services import calendar_service
+
+calendar_bp = Blueprint("calendar", __name__, url_prefix="/api/calendar")
+
+
+@calendar_bp.get("/feed-url")
+def feed_url():
+    """Link do feed do barbeiro logado, para assinar no app de calendário."""
+    if not exigir_login("barbeiro"):
+        return jsonify({"success": False, "message": "Apenas barbeiros"}), 401
+
+    return jsonify({"success": True, "data": {"url": _feed_url(session.get("user_id"))}})
+
+
+@calendar_bp.post("/feed-url/reset")
+def reset_feed_url():
+    """Gera um novo link do feed; o anterior deixa de funcionar."""
+    if not exigir_login("barbeiro"):
+        return jsonify({"success": False, "message": "Apenas barbeiros"}), 401
+
+    return jsonify({"success": True, "data": {"url": _feed_url(session.get("user_id"), rotate=True)}})
+
+
+def _feed_url(professional_id, rotate=False):
+    token = calendar_service.feed_token(professional_id, rotate=rotate)
+    return url_for("calendar.feed", professional_id=professional_id, token=token, _external=True)
+
+
+@calendar_bp.get("/<int:professional_id>.ics")
+def feed(professional_id: int):
+    """Agenda do profissional em iCalendar; 304 se o If-None-Match ainda vale."""
+    if not calendar_service.check_feed_token(professional_id, request.args.get("token")):
+        return jsonify({"success": False, "message": "Token inválido"}), 403
+
+    etag = calendar_service.feed_etag(professional_id)
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+    if etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+
+    professional = db.session.get(Professional, professional_id)
+    if professional is None:
+        return jsonify({"success": False, "message": "Profissional não encontrado"}), 404
+
+    stream = calendar_service.open_feed(professional_id, f"Corte Digital - {professional.nome}")
+    headers.update({
+        "Content-Disposition": f"inline; filename=agenda-{professional_id}.ics",
+        "X-Accel-Buffering": "no",
+    })
+    return Response(stream, mimetype="text/calendar", headers=headers)
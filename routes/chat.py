@@ -21,19 +21,16 @@ def get_available_users():
         return jsonify({'success': False, 'message': 'Não autenticado'}), 401
     
     try:
-        from db import Barber, Cliente
+        from read_models import list_contacts
         
         user_tipo = session.get('tipo', 'cliente')
         
         # Se é cliente, lista barbeiros. Se é barbeiro, lista clientes
-        if user_tipo == 'cliente':
-            users = Barber.query.order_by(Barber.nome).all()
-        else:
-            users = Cliente.query.order_by(Cliente.nome).all()
+        users = list_contacts('barbeiro' if user_tipo == 'cliente' else 'cliente')
         
         return jsonify({
             'success': True,
-            'users': [{'id': u.id, 'nome': u.nome, 'email': u.email} for u in users]
+            'users': [u.to_dict() for u in users]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
@@ -250,20 +247,19 @@ def get_users_by_type(user_type):
         return jsonify({'success': False, 'message': 'Não autenticado'}), 401
     
     try:
-        from db import Barber, Cliente
+        from read_models import list_contacts
         
         current_user_id = session['user_id']
         
         if user_type == 'barbeiro':
             exclude_id = current_user_id if session.get('tipo') == 'barbeiro' else 0
-            users = Barber.query.filter(Barber.id != exclude_id).order_by(Barber.nome).all()
         else:
             exclude_id = current_user_id if session.get('tipo') == 'cliente' else 0
-            users = Cliente.query.filter(Cliente.id != exclude_id).order_by(Cliente.nome).all()
+        users = list_contacts(user_type, exclude_id)
         
         return jsonify({
             'success': True,
-            'users': [{'id': u.id, 'nome': u.nome, 'email': u.email} for u in users]
+            'users': [u.to_dict() for u in users]
         })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
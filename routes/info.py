@@ -1,20 +1,40 @@
 """Rotas com informações gerais (barbeiros, serviços, notificações, relatórios)."""
 
-from flask import Blueprint, jsonify
+from flask import Blueprint, Response, jsonify, request
 
-from services import list_barbers, list_services, list_notifications, report_week
+from config import Config
+from services import list_barbers, list_services, booking_bootstrap, list_notifications, report_week
+from services.catalog_cache import catalog_cache
 
 info_bp = Blueprint("info", __name__, url_prefix="/api")
 
 
+def _catalog_response(name, build):
+    """Resposta do catálogo em cache, com ETag forte; 304 se o If-None-Match ainda vale."""
+    entry = catalog_cache.get(name, lambda: {"success": True, "data": build()})
+    headers = {
+        "ETag": f'"{entry.etag}"',
+        "Cache-Control": f"public, max-age={Config.CATALOG_MAX_AGE}, must-revalidate",
+    }
+    if entry.etag in request.if_none_match:
+        return Response(status=304, headers=headers)
+    return Response(entry.body, mimetype="application/json", headers=headers)
+
+
 @info_bp.get("/barbers")
 def listar_barbeiros():
-    return jsonify({"success": True, "data": list_barbers()})
+    return _catalog_response("barbers", list_barbers)
 
 
 @info_bp.get("/services")
 def listar_servicos():
-    return jsonify({"success": True, "data": list_services()})
+    return _catalog_response("services", list_services)
+
+
+@info_bp.get("/booking/bootstrap")
+def bootstrap_agendamento():
+    """Serviços, profissionais e preços de cada um numa única resposta (tela de agendamento)."""
+    return _catalog_response("booking_bootstrap", booking_bootstrap)
 
 
 @info_bp.get("/notifications")
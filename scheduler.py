@@ -0,0 +1,207 @@
+"""Agendador de tarefas em segundo plano.
+
+Tarefas periódicas (com jitter) rodam numa tarefa de fundo do Socket.IO, o
+que funciona tanto com threads quanto com gevent. Com vários workers, cada
+tarefa só roda no worker que detém o lock consultivo do MySQL
+(``GET_LOCK``) daquela tarefa: o lock fica preso a uma conexão dedicada e,
+se o worker líder cair, outro assume na rodada seguinte.
+"""
+import os
+import random
+import time
+import traceback
+
+import pymysql
+
+from config import Config
+from database_config import _parse_database_url
+
+LOCK_PREFIX = 'corte_digital:job:'
+
+
+class Job:
+    """Tarefa periódica e suas métricas de execução."""
+
+    def __init__(self, name, func, interval, jitter=0.1, leader_only=True):
+        self.name = name
+        self.leader_only = leader_only
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.next_run = 0.0
+        self.is_leader = False
+        self.stats = {
+            'runs': 0,
+            'failures': 0,
+            'skipped_not_leader': 0,
+            'last_run_at': None,
+            'last_duration_ms': None,
+            'max_duration_ms': 0.0,
+            'total_duration_ms': 0.0,
+            'last_result': None,
+            'last_error': None,
+        }
+
+    def schedule_next(self, now, first=False):
+        if first:
+            # Espalha a primeira execução para os workers não rodarem juntos
+            delay = random.uniform(0, self.interval * self.jitter)
+        else:
+            spread = self.interval * self.jitter
+            delay = self.interval + random.uniform(-spread, spread)
+        self.next_run = now + max(delay, 0.0)
+
+
+class Scheduler:
+    """Executa tarefas periódicas com eleição de líder via GET_LOCK."""
+
+    def __init__(self, app, socketio):
+        self.app = app
+        self.socketio = socketio
+        self.jobs = {}
+        self._running = False
+        self._lock_connection = None
+
+    def add_job(self, name, func, interval, jitter=0.1, leader_only=True):
+        """Registra ``func`` para rodar a cada ``interval`` segundos (± jitter).
+
+        ``leader_only=False`` roda a tarefa em todos os workers (para tarefas
+        idempotentes que dependem de estado local do processo).
+        """
+        self.jobs[name] = Job(name, func, interval, jitter, leader_only)
+        return self.jobs[name]
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        now = time.monotonic()
+        for job in self.jobs.values():
+            job.schedule_next(now, first=True)
+        self.socketio.start_background_task(self._loop)
+        print(f"⏱️  Agendador iniciado ({len(self.jobs)} tarefa(s), pid {os.getpid()})")
+
+    def stop(self):
+        self._running = False
+        self._close_lock_connection()
+
+    def stats(self):
+        """Métricas por tarefa."""
+        return {
+            name: {**job.stats, 'interval': job.interval, 'is_leader': job.is_leader}
+            for name, job in self.jobs.items()
+        }
+
+    def _loop(self):
+        while self._running:
+            now = time.monotonic()
+            for job in self.jobs.values():
+                if job.next_run <= now:
+                    self._run_job(job)
+                    job.schedule_next(time.monotonic())
+
+            next_run = min((job.next_run for job in self.jobs.values()), default=now + 1)
+            self.socketio.sleep(min(max(next_run - time.monotonic(), 0.05), 1.0))
+
+    # Eleição de líder ------------------------------------------------------
+
+    def _get_lock_connection(self):
+        connection = self._lock_connection
+        if connection is not None:
+            try:
+                connection.ping(reconnect=False)
+                return connection
+            except Exception:
+                # Conexão caiu: os locks se perderam junto com ela
+                self._close_lock_connection()
+
+        self._lock_connection = pymysql.connect(
+            charset='utf8mb4',
+            cursorclass=pymysql.cursors.DictCursor,
+            autocommit=True,
+            **_parse_database_url(Config.DATABASE_URL)
+        )
+        return self._lock_connection
+
+    def _close_lock_connection(self):
+        connection, self._lock_connection = self._lock_connection, None
+        for job in self.jobs.values():
+            job.is_leader = False
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _ensure_leader(self, job):
+        """True se este worker detém (ou acabou de obter) o lock da tarefa."""
+        connection = self._get_lock_connection()
+        if job.is_leader:
+            return True
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 0) as locked", (LOCK_PREFIX + job.name,))
+            job.is_leader = bool(cursor.fetchone()['locked'])
+
+        if job.is_leader:
+            print(f"👑 Worker {os.getpid()} é o líder da tarefa '{job.name}'")
+        return job.is_leader
+
+    # Execução ---------------------------------------------------------------
+
+    def _run_job(self, job):
+        try:
+            if job.leader_only and not self._ensure_leader(job):
+                job.stats['skipped_not_leader'] += 1
+                return
+        except Exception as e:
+            print(f"⚠️  Não foi possível disputar o lock da tarefa '{job.name}': {e}")
+            self._close_lock_connection()
+            job.stats['skipped_not_leader'] += 1
+            return
+
+        started = time.perf_counter()
+        job.stats['last_run_at'] = time.time()
+        try:
+            with self.app.app_context():
+                job.stats['last_result'] = job.func()
+            job.stats['last_error'] = None
+        except Exception as e:
+            job.stats['failures'] += 1
+            job.stats['last_error'] = str(e)
+            print(f"❌ Erro na tarefa '{job.name}': {e}")
+            traceback.print_exc()
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            job.stats['runs'] += 1
+            job.stats['last_duration_ms'] = round(duration_ms, 3)
+            job.stats['total_duration_ms'] = round(job.stats['total_duration_ms'] + duration_ms, 3)
+            job.stats['max_duration_ms'] = round(max(job.stats['max_duration_ms'], duration_ms), 3)
+
+
+def create_scheduler(app, socketio):
+    """Cria o agendador com as tarefas periódicas da aplicação."""
+    import services
+
+    scheduler = Scheduler(app, socketio)
+    scheduler.add_job(
+        'auto_complete_past_appointments',
+        services.auto_complete_past_appointments,
+        interval=Config.AUTO_COMPLETE_INTERVAL,
+        jitter=Config.SCHEDULER_JITTER,
+    )
+    scheduler.add_job(
+        'purge_past_slot_claims',
+        services.purge_past_slot_claims,
+        interval=24 * 3600,
+        jitter=Config.SCHEDULER_JITTER,
+    )
+    # Cada worker conclui, no horário, os agendamentos do seu heap em memória
+    scheduler.add_job(
+        'complete_due_appointments',
+        services.complete_due_appointments,
+        interval=Config.DUE_TIMER_RESOLUTION,
+        jitter=0,
+        leader_only=False,
+    )
+    return scheduler
@@ -12,16 +12,24 @@ from .auth_service import (
 from .appointment_service import (
     list_appointments_for_user,
     list_appointments_for_barber,
+    list_appointments_page_for_user,
+    list_appointments_page_for_barber,
     create_appointment,
+    create_appointment_series,
+    series_occurrences,
     cancel_appointment_by_id,
     update_appointment_status,
-    auto_complete_past_appointments
+    auto_complete_past_appointments,
+    complete_due_appointments,
+    purge_past_slot_claims,
+    SlotUnavailableError
 )
 
 # Serviços de informações
 from .info_service import (
     list_barbers,
     list_services,
+    booking_bootstrap,
     list_notifications,
     report_week
 )
@@ -32,6 +40,8 @@ try:
     from . import notification_service
     from . import analytics_service
     from . import review_service
+    from . import availability_service
+    from . import calendar_service
 except ImportError:
     pass
 
@@ -69,7 +79,16 @@ def init_app(app):
     
     db.init_app(app)
     
+    # Conexão pymysql compartilhada por requisição nos serviços de SQL puro
+    import database_config
+    database_config.init_app(app)
+    
+    # Contagem/tempo de consultas por requisição (Server-Timing e aviso de N+1)
+    import query_metrics
+    query_metrics.init_app(app)
+    
     with app.app_context():
+        query_metrics.instrument_engine(db.engine)
         db.create_all()
 
 
@@ -80,17 +99,27 @@ __all__ = [
     'usuario_atual',
     'list_appointments_for_user',
     'list_appointments_for_barber',
+    'list_appointments_page_for_user',
+    'list_appointments_page_for_barber',
     'create_appointment',
+    'create_appointment_series',
+    'series_occurrences',
     'cancel_appointment_by_id',
     'update_appointment_status',
     'auto_complete_past_appointments',
+    'complete_due_appointments',
+    'purge_past_slot_claims',
+    'SlotUnavailableError',
     'list_barbers',
     'list_services',
+    'booking_bootstrap',
     'list_notifications',
     'report_week',
     'init_app',
     'chat_service',
     'notification_service',
     'analytics_service',
-    'review_service'
+    'review_service',
+    'availability_service',
+    'calendar_service'
 ]
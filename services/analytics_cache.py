@@ -0,0 +1,193 @@
+"""
+Cache dos resultados de analytics por usuário.
+
+Cada resultado fica sob (dono, widget, argumentos), onde o dono é
+('barbeiro', id) ou ('cliente', id). Uma escrita em agendamentos ou
+avaliações incrementa a versão só dos donos envolvidos, então reabrir o
+dashboard de outros usuários continua em cache; o TTL cobre escritas feitas
+por outros workers e números que dependem do relógio (próximos agendamentos,
+mês atual).
+
+Requisições simultâneas com a mesma chave fria calculam uma única vez
+(single-flight): a primeira calcula e as demais esperam o resultado.
+
+Os widgets leem da réplica, que pode estar até DB_REPLICA_MAX_LAG segundos
+atrás; o recálculo de um dono que acabou de escrever lê do primário, senão o
+dado anterior à escrita ficaria em cache sob a versão nova.
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect
+
+from config import Config
+from database_config import _new_event, read_from_primary
+from db import Appointment, Review
+from services import commit_hooks
+
+
+def owner_key(user_type, user_id):
+    return ('barbeiro' if user_type == 'barbeiro' else 'cliente', int(user_id))
+
+
+class _Flight:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self):
+        # Evento do gevent quando ele roda sem monkey-patch: esperar não trava o hub
+        self.done = _new_event()
+        self.value = None
+        self.error = None
+
+
+class AnalyticsCache:
+    """LRU + TTL por (dono, widget, argumentos), versionado por dono."""
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or Config.ANALYTICS_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else Config.ANALYTICS_CACHE_TTL
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._written_at = OrderedDict()  # dono -> última invalidação, mais antigas à esquerda
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    def get_or_compute(self, owner, name, args, compute):
+        """Resultado em cache de ``compute()``; calcula uma vez por chave fria."""
+        key = (owner, name, args)
+        with self._lock:
+            version = self._versions.get(owner, 0)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and time.monotonic() < entry[1]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+
+            # A versão entra na chave do voo: depois de uma escrita ninguém pega carona no cálculo antigo
+            flight_key = key + (version,)
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[flight_key] = _Flight()
+                self.misses += 1
+            else:
+                self.waits += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                if self._versions.get(owner, 0) == version:
+                    self._entries[key] = (version, time.monotonic() + self.ttl, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(flight_key, None)
+            flight.done.set()
+
+    def invalidate(self, *owners):
+        """Descarta os resultados dos donos (('barbeiro', id) / ('cliente', id))."""
+        now = time.monotonic()
+        with self._lock:
+            for owner in owners:
+                self._versions[owner] = self._versions.get(owner, 0) + 1
+                self._written_at[owner] = now
+                self._written_at.move_to_end(owner)
+            # Só importam as escritas ainda dentro do atraso aceito da réplica
+            while self._written_at and now - next(iter(self._written_at.values())) > Config.DB_REPLICA_MAX_LAG:
+                self._written_at.popitem(last=False)
+
+    def recently_written(self, owner):
+        """O dono foi invalidado há menos de DB_REPLICA_MAX_LAG segundos?"""
+        with self._lock:
+            written_at = self._written_at.get(owner)
+        return written_at is not None and time.monotonic() - written_at <= Config.DB_REPLICA_MAX_LAG
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+
+
+analytics_cache = AnalyticsCache()
+
+
+def cached_result(name, user_type=None):
+    """Decorador para funções ``f(user_id, ...)`` de analytics.
+
+    O tipo do dono é ``user_type`` (funções só de barbeiro) ou o segundo
+    argumento posicional da função.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(user_id, *args, **kwargs):
+            owner = owner_key(user_type or args[0], user_id)
+            key_args = args + tuple(sorted(kwargs.items()))
+
+            def compute():
+                if analytics_cache.recently_written(owner):
+                    with read_from_primary():
+                        return func(user_id, *args, **kwargs)
+                return func(user_id, *args, **kwargs)
+
+            return analytics_cache.get_or_compute(owner, name, key_args, compute)
+        return wrapper
+    return decorator
+
+
+def appointment_owners(barbeiro_id, cliente_id):
+    """Donos afetados por uma escrita num agendamento ou avaliação."""
+    owners = []
+    if barbeiro_id is not None:
+        owners.append(('barbeiro', int(barbeiro_id)))
+    if cliente_id is not None:
+        owners.append(('cliente', int(cliente_id)))
+    return owners
+
+
+def _changed_owners(target, professional_attr):
+    state = inspect(target)
+    owners = []
+    for attr, kind in ((professional_attr, 'barbeiro'), ('cliente_id', 'cliente')):
+        history = state.attrs[attr].history
+        # Agendamento transferido de profissional/cliente: o anterior também muda
+        for value in (getattr(target, attr), *(history.deleted or ())):
+            if value is not None:
+                owners.append((kind, int(value)))
+    return owners
+
+
+@commit_hooks.on_commit('analytics')
+def _apply_analytics_changes(owners):
+    analytics_cache.invalidate(*owners)
+
+
+commit_hooks.watch((Appointment,), 'analytics', lambda target: _changed_owners(target, 'barbeiro_id'))
+commit_hooks.watch((Review,), 'analytics', lambda target: _changed_owners(target, 'profissional_id'))
@@ -1,11 +1,81 @@
 """
 Serviço de Analytics e Estatísticas
 Dashboard com gráficos e métricas
+
+Os gráficos leem a tabela de fatos appointment_daily_stats (ver
+daily_stats.py); os números do dashboard vêm direto de appointments.
+Os resultados ficam em cache por usuário (analytics_cache).
 """
+import threading
 from datetime import datetime, timedelta
-from database_config import get_database_connection
 
+import pandas as pd
+
+from config import Config
+from database_config import get_database_connection, tolerates_replica_lag, _new_executor
+from services.analytics_cache import cached_result
+
+
+def _days_ago(days):
+    """Meia-noite de N dias atrás (limite inferior de faixas em start_at)."""
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=days)
+
+
+def _month_range(months_back=0):
+    """Intervalo [início do mês, início do mês seguinte) de N meses atrás."""
+    start = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(months_back):
+        start = (start - timedelta(days=1)).replace(day=1)
+    next_start = (start + timedelta(days=32)).replace(day=1)
+    return start, next_start
+
+
+# Período do gráfico -> (dias para trás, agrupamento padrão)
+CHART_PERIODS = {
+    'week': (7, 'day'),
+    'month': (30, 'day'),
+    'year': (365, 'month'),
+}
+
+# Agrupamento -> (frequência do pandas, formato do rótulo do início do grupo)
+CHART_BUCKETS = {
+    'day': ('D', '%d/%m'),
+    'week': ('W-SUN', '%d/%m'),
+    'month': ('M', '%m/%Y'),
+}
 
+
+def _chart_range(period, bucket=None):
+    """(primeiro dia, agrupamento) do gráfico; ValueError para agrupamento inválido."""
+    days, default_bucket = CHART_PERIODS.get(period, CHART_PERIODS['year'])
+    bucket = bucket or default_bucket
+    if bucket not in CHART_BUCKETS:
+        raise ValueError(f"Agrupamento inválido: {bucket} (use {', '.join(CHART_BUCKETS)})")
+    return _days_ago(days).date(), bucket
+
+
+def _bucket_series(rows, value_key, first_day, bucket):
+    """Soma os totais diários por dia/semana/mês e preenche os grupos vazios com zero.
+
+    ``rows`` são os totais por dia (chave 'date'); o eixo vai de ``first_day``
+    até hoje (ou até o último dia com dados, se houver agendamentos futuros).
+    """
+    freq, label_format = CHART_BUCKETS[bucket]
+    frame = pd.DataFrame(rows, columns=['date', value_key])
+    dates = pd.to_datetime(frame['date'])
+    last_day = max(pd.Timestamp(datetime.now().date()), dates.max()) if len(dates) else datetime.now().date()
+
+    periods = pd.period_range(first_day, last_day, freq=freq)
+    totals = (pd.to_numeric(frame[value_key]).astype(float)
+              .groupby(dates.dt.to_period(freq)).sum()
+              .reindex(periods, fill_value=0.0))
+
+    return periods.start_time.strftime(label_format).tolist(), totals.to_numpy()
+
+
+@cached_result('dashboard')
+@tolerates_replica_lag()
 def get_dashboard_stats(user_id, user_type):
     """Obtém estatísticas para o dashboard"""
     conn = get_database_connection()
@@ -22,151 +92,86 @@ def get_dashboard_stats(user_id, user_type):
 
 
 def get_barber_stats(cursor, barbeiro_id):
-    """Estatísticas do barbeiro"""
-    stats = {}
+    """Estatísticas do barbeiro (uma agregação condicional sobre a faixa barbeiro_id)"""
+    month_start, next_month_start = _month_range(0)
     
-    # Total de agendamentos
     cursor.execute("""
-        SELECT COUNT(*) as total FROM appointments
-        WHERE barbeiro_id = %s
-    """, (barbeiro_id,))
-    stats['total_appointments'] = cursor.fetchone()['total']
-    
-    # Agendamentos este mês
-    cursor.execute("""
-        SELECT COUNT(*) as total FROM appointments
-        WHERE barbeiro_id = %s 
-        AND MONTH(data) = MONTH(CURRENT_DATE())
-        AND YEAR(data) = YEAR(CURRENT_DATE())
-    """, (barbeiro_id,))
-    stats['appointments_this_month'] = cursor.fetchone()['total']
-    
-    # Faturamento este mês
-    cursor.execute("""
-        SELECT COALESCE(SUM(s.preco), 0) as total
-        FROM appointments a
-        JOIN services s ON a.servico_id = s.id
-        WHERE a.barbeiro_id = %s 
-        AND a.status = 'concluido'
-        AND MONTH(a.data) = MONTH(CURRENT_DATE())
-        AND YEAR(a.data) = YEAR(CURRENT_DATE())
-    """, (barbeiro_id,))
-    stats['revenue_this_month'] = float(cursor.fetchone()['total'])
-    
-    # Clientes únicos
-    cursor.execute("""
-        SELECT COUNT(DISTINCT cliente_id) as total
-        FROM appointments
-        WHERE barbeiro_id = %s
-    """, (barbeiro_id,))
-    stats['unique_clients'] = cursor.fetchone()['total']
-    
-    # Próximos agendamentos
-    cursor.execute("""
-        SELECT COUNT(*) as total FROM appointments
-        WHERE barbeiro_id = %s 
-        AND status = 'agendado'
-        AND CONCAT(data, ' ', horario) >= NOW()
-    """, (barbeiro_id,))
-    stats['upcoming_appointments'] = cursor.fetchone()['total']
-    
-    # Taxa de conclusão
-    cursor.execute("""
-        SELECT 
+        SELECT
             COUNT(*) as total,
-            SUM(CASE WHEN status = 'concluido' THEN 1 ELSE 0 END) as concluidos
-        FROM appointments
-        WHERE barbeiro_id = %s
-    """, (barbeiro_id,))
+            COALESCE(SUM(a.start_at >= %s AND a.start_at < %s), 0) as this_month,
+            COALESCE(SUM(CASE WHEN a.status = 'concluido'
+                               AND a.start_at >= %s AND a.start_at < %s
+                              THEN s.preco ELSE 0 END), 0) as revenue_this_month,
+            COUNT(DISTINCT a.cliente_id) as unique_clients,
+            COALESCE(SUM(a.status = 'agendado' AND a.start_at >= %s), 0) as upcoming,
+            COALESCE(SUM(a.status = 'concluido'), 0) as concluidos
+        FROM appointments a
+        LEFT JOIN services s ON a.servico_id = s.id
+        WHERE a.barbeiro_id = %s
+    """, (month_start, next_month_start, month_start, next_month_start, datetime.now(), barbeiro_id))
     result = cursor.fetchone()
-    if result['total'] > 0:
-        stats['completion_rate'] = (result['concluidos'] / result['total']) * 100
-    else:
-        stats['completion_rate'] = 0
     
-    return stats
+    total = int(result['total'])
+    return {
+        'total_appointments': total,
+        'appointments_this_month': int(result['this_month']),
+        'revenue_this_month': float(result['revenue_this_month']),
+        'unique_clients': int(result['unique_clients']),
+        'upcoming_appointments': int(result['upcoming']),
+        'completion_rate': (int(result['concluidos']) / total) * 100 if total > 0 else 0,
+    }
 
 
 def get_client_stats(cursor, cliente_id):
-    """Estatísticas do cliente"""
-    stats = {}
-    
-    # Total de agendamentos
-    cursor.execute("""
-        SELECT COUNT(*) as total FROM appointments
-        WHERE cliente_id = %s
-    """, (cliente_id,))
-    stats['total_appointments'] = cursor.fetchone()['total']
-    
-    # Agendamentos concluídos
-    cursor.execute("""
-        SELECT COUNT(*) as total FROM appointments
-        WHERE cliente_id = %s AND status = 'concluido'
-    """, (cliente_id,))
-    stats['completed_appointments'] = cursor.fetchone()['total']
-    
-    # Total gasto
+    """Estatísticas do cliente (uma agregação condicional sobre a faixa cliente_id)"""
     cursor.execute("""
-        SELECT COALESCE(SUM(s.preco), 0) as total
+        SELECT
+            COUNT(*) as total,
+            COALESCE(SUM(a.status = 'concluido'), 0) as completed,
+            COALESCE(SUM(CASE WHEN a.status = 'concluido' THEN s.preco ELSE 0 END), 0) as total_spent,
+            COALESCE(SUM(a.status = 'agendado' AND a.start_at >= %s), 0) as upcoming
         FROM appointments a
-        JOIN services s ON a.servico_id = s.id
-        WHERE a.cliente_id = %s AND a.status = 'concluido'
-    """, (cliente_id,))
-    stats['total_spent'] = float(cursor.fetchone()['total'])
-    
-    # Próximos agendamentos
-    cursor.execute("""
-        SELECT COUNT(*) as total FROM appointments
-        WHERE cliente_id = %s 
-        AND status = 'agendado'
-        AND CONCAT(data, ' ', horario) >= NOW()
-    """, (cliente_id,))
-    stats['upcoming_appointments'] = cursor.fetchone()['total']
+        LEFT JOIN services s ON a.servico_id = s.id
+        WHERE a.cliente_id = %s
+    """, (datetime.now(), cliente_id))
+    result = cursor.fetchone()
     
-    return stats
+    return {
+        'total_appointments': int(result['total']),
+        'completed_appointments': int(result['completed']),
+        'total_spent': float(result['total_spent']),
+        'upcoming_appointments': int(result['upcoming']),
+    }
 
 
-def get_appointments_chart_data(user_id, user_type, period='month'):
-    """Dados para gráfico de agendamentos"""
+@cached_result('appointments-chart')
+@tolerates_replica_lag()
+def get_appointments_chart_data(user_id, user_type, period='month', bucket=None):
+    """Dados para gráfico de agendamentos, agrupados por dia, semana ou mês"""
+    first_day, bucket = _chart_range(period, bucket)
     conn = get_database_connection()
     cursor = conn.cursor()
     
     try:
-        if period == 'week':
-            days = 7
-            date_format = '%d/%m'
-        elif period == 'month':
-            days = 30
-            date_format = '%d/%m'
-        else:  # year
-            days = 365
-            date_format = '%m/%Y'
-        
         user_field = 'barbeiro_id' if user_type == 'barbeiro' else 'cliente_id'
         
         cursor.execute(f"""
             SELECT 
-                DATE(data) as date,
-                COUNT(*) as count
-            FROM appointments
+                day as date,
+                SUM(appointments) as count
+            FROM appointment_daily_stats
             WHERE {user_field} = %s
-            AND data >= DATE_SUB(CURRENT_DATE(), INTERVAL %s DAY)
-            GROUP BY DATE(data)
-            ORDER BY date
-        """, (user_id, days))
+            AND day >= %s
+            GROUP BY day
+            HAVING count > 0
+        """, (user_id, first_day))
         
-        results = cursor.fetchall()
-        
-        # Formata dados
-        labels = []
-        data = []
-        for row in results:
-            labels.append(row['date'].strftime(date_format))
-            data.append(row['count'])
+        labels, totals = _bucket_series(cursor.fetchall(), 'count', first_day, bucket)
         
         return {
             'labels': labels,
-            'data': data
+            'data': totals.astype(int).tolist(),
+            'bucket': bucket
         }
         
     finally:
@@ -174,46 +179,34 @@ def get_appointments_chart_data(user_id, user_type, period='month'):
         conn.close()
 
 
-def get_revenue_chart_data(barbeiro_id, period='month'):
-    """Dados para gráfico de faturamento (apenas barbeiro)"""
+@cached_result('revenue-chart', user_type='barbeiro')
+@tolerates_replica_lag()
+def get_revenue_chart_data(barbeiro_id, period='month', bucket=None):
+    """Dados para gráfico de faturamento (apenas barbeiro), agrupados por dia, semana ou mês"""
+    first_day, bucket = _chart_range(period, bucket)
     conn = get_database_connection()
     cursor = conn.cursor()
     
     try:
-        if period == 'week':
-            days = 7
-            date_format = '%d/%m'
-        elif period == 'month':
-            days = 30
-            date_format = '%d/%m'
-        else:  # year
-            days = 365
-            date_format = '%m/%Y'
-        
         cursor.execute("""
             SELECT 
-                DATE(a.data) as date,
-                COALESCE(SUM(s.preco), 0) as revenue
-            FROM appointments a
-            JOIN services s ON a.servico_id = s.id
-            WHERE a.barbeiro_id = %s
-            AND a.status = 'concluido'
-            AND a.data >= DATE_SUB(CURRENT_DATE(), INTERVAL %s DAY)
-            GROUP BY DATE(a.data)
-            ORDER BY date
-        """, (barbeiro_id, days))
+                r.day as date,
+                COALESCE(SUM(r.appointments * s.preco), 0) as revenue
+            FROM appointment_daily_stats r
+            JOIN services s ON r.servico_id = s.id
+            WHERE r.barbeiro_id = %s
+            AND r.day >= %s
+            AND r.status = 'concluido'
+            GROUP BY r.day
+            HAVING SUM(r.appointments) > 0
+        """, (barbeiro_id, first_day))
         
-        results = cursor.fetchall()
-        
-        labels = []
-        data = []
-        for row in results:
-            labels.append(row['date'].strftime(date_format))
-            data.append(float(row['revenue']))
+        labels, totals = _bucket_series(cursor.fetchall(), 'revenue', first_day, bucket)
         
         return {
             'labels': labels,
-            'data': data
+            'data': totals.round(2).tolist(),
+            'bucket': bucket
         }
         
     finally:
@@ -221,6 +214,8 @@ def get_revenue_chart_data(barbeiro_id, period='month'):
         conn.close()
 
 
+@cached_result('services-distribution')
+@tolerates_replica_lag()
 def get_services_distribution(user_id, user_type):
     """Distribuição de serviços mais populares"""
     conn = get_database_connection()
@@ -232,11 +227,12 @@ def get_services_distribution(user_id, user_type):
         cursor.execute(f"""
             SELECT 
                 s.nome as service,
-                COUNT(*) as count
-            FROM appointments a
-            JOIN services s ON a.servico_id = s.id
-            WHERE a.{user_field} = %s
+                SUM(r.appointments) as count
+            FROM appointment_daily_stats r
+            JOIN services s ON r.servico_id = s.id
+            WHERE r.{user_field} = %s
             GROUP BY s.id, s.nome
+            HAVING count > 0
             ORDER BY count DESC
             LIMIT 5
         """, (user_id,))
@@ -244,7 +240,7 @@ def get_services_distribution(user_id, user_type):
         results = cursor.fetchall()
         
         labels = [row['service'] for row in results]
-        data = [row['count'] for row in results]
+        data = [int(row['count']) for row in results]
         
         return {
             'labels': labels,
@@ -256,6 +252,8 @@ def get_services_distribution(user_id, user_type):
         conn.close()
 
 
+@cached_result('peak-hours', user_type='barbeiro')
+@tolerates_replica_lag()
 def get_peak_hours(barbeiro_id):
     """Horários de pico (apenas barbeiro)"""
     conn = get_database_connection()
@@ -264,18 +262,19 @@ def get_peak_hours(barbeiro_id):
     try:
         cursor.execute("""
             SELECT 
-                HOUR(horario) as hour,
-                COUNT(*) as count
-            FROM appointments
+                hour,
+                SUM(appointments) as count
+            FROM appointment_daily_stats
             WHERE barbeiro_id = %s
-            GROUP BY HOUR(horario)
+            GROUP BY hour
+            HAVING count > 0
             ORDER BY hour
         """, (barbeiro_id,))
         
         results = cursor.fetchall()
         
         labels = [f"{row['hour']:02d}:00" for row in results]
-        data = [row['count'] for row in results]
+        data = [int(row['count']) for row in results]
         
         return {
             'labels': labels,
@@ -287,6 +286,8 @@ def get_peak_hours(barbeiro_id):
         conn.close()
 
 
+@cached_result('top-clients', user_type='barbeiro')
+@tolerates_replica_lag()
 def get_top_clients(barbeiro_id, limit=10):
     """Clientes mais frequentes (apenas barbeiro)"""
     conn = get_database_connection()
@@ -320,6 +321,8 @@ def get_top_clients(barbeiro_id, limit=10):
         conn.close()
 
 
+@cached_result('monthly-comparison')
+@tolerates_replica_lag()
 def get_monthly_comparison(user_id, user_type):
     """Comparação mês atual vs mês anterior"""
     conn = get_database_connection()
@@ -328,25 +331,22 @@ def get_monthly_comparison(user_id, user_type):
     try:
         user_field = 'barbeiro_id' if user_type == 'barbeiro' else 'cliente_id'
         
-        # Mês atual
-        cursor.execute(f"""
-            SELECT COUNT(*) as count
-            FROM appointments
-            WHERE {user_field} = %s
-            AND MONTH(data) = MONTH(CURRENT_DATE())
-            AND YEAR(data) = YEAR(CURRENT_DATE())
-        """, (user_id,))
-        current_month = cursor.fetchone()['count']
+        current_start, next_start = _month_range(0)
+        previous_start, _ = _month_range(1)
         
-        # Mês anterior
+        # Mês atual e anterior numa única faixa indexada em day
         cursor.execute(f"""
-            SELECT COUNT(*) as count
-            FROM appointments
+            SELECT
+                COALESCE(SUM(CASE WHEN day >= %s THEN appointments ELSE 0 END), 0) as current_month,
+                COALESCE(SUM(CASE WHEN day < %s THEN appointments ELSE 0 END), 0) as previous_month
+            FROM appointment_daily_stats
             WHERE {user_field} = %s
-            AND MONTH(data) = MONTH(DATE_SUB(CURRENT_DATE(), INTERVAL 1 MONTH))
-            AND YEAR(data) = YEAR(DATE_SUB(CURRENT_DATE(), INTERVAL 1 MONTH))
-        """, (user_id,))
-        previous_month = cursor.fetchone()['count']
+            AND day >= %s AND day < %s
+        """, (current_start.date(), current_start.date(), user_id,
+              previous_start.date(), next_start.date()))
+        result = cursor.fetchone()
+        current_month = int(result['current_month'])
+        previous_month = int(result['previous_month'])
         
         # Calcula variação percentual
         if previous_month > 0:
@@ -363,3 +363,57 @@ def get_monthly_comparison(user_id, user_type):
     finally:
         cursor.close()
         conn.close()
+
+
+# Widgets do dashboard: nome -> (função(user_id, user_type, period), apenas barbeiro)
+WIDGETS = {
+    'dashboard': (lambda uid, utype, period: get_dashboard_stats(uid, utype), False),
+    'appointments-chart': (get_appointments_chart_data, False),
+    'revenue-chart': (lambda uid, utype, period: get_revenue_chart_data(uid, period), True),
+    'services-distribution': (lambda uid, utype, period: get_services_distribution(uid, utype), False),
+    'peak-hours': (lambda uid, utype, period: get_peak_hours(uid), True),
+    'top-clients': (lambda uid, utype, period: get_top_clients(uid), True),
+    'monthly-comparison': (lambda uid, utype, period: get_monthly_comparison(uid, utype), False),
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = _new_executor(Config.ANALYTICS_BUNDLE_WORKERS, thread_name_prefix='analytics')
+        return _executor
+
+
+def get_dashboard_bundle(user_id, user_type, widgets, period='month'):
+    """Executa vários widgets em paralelo e devolve {'data': {...}, 'errors': {...}}.
+
+    Cada widget roda numa thread (ou greenlet, com gevent sem monkey-patch)
+    do executor limitado a ANALYTICS_BUNDLE_WORKERS, fora do contexto da
+    requisição, então usa a sua própria conexão do pool (ou da réplica) em vez
+    da conexão compartilhada da requisição. O tempo total fica perto do widget
+    mais lento.
+    """
+    unknown = [name for name in widgets if name not in WIDGETS]
+    if unknown:
+        raise ValueError(f"Widget(s) desconhecido(s): {', '.join(unknown)}")
+
+    data, errors, futures = {}, {}, {}
+    for name in dict.fromkeys(widgets):
+        func, barber_only = WIDGETS[name]
+        if barber_only and user_type != 'barbeiro':
+            errors[name] = 'Acesso negado'
+            continue
+        futures[name] = _get_executor().submit(func, user_id, user_type, period)
+
+    for name, future in futures.items():
+        try:
+            data[name] = future.result()
+        except Exception as e:
+            print(f"❌ Erro no widget de analytics '{name}': {e}")
+            errors[name] = str(e)
+
+    return {'data': data, 'errors': errors}
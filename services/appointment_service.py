@@ -1,61 +1,389 @@
 """Serviço de gerenciamento de agendamentos."""
 from flask import session
-from db import db, Appointment
-from datetime import datetime
+from config import Config
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+from db import (db, Appointment, AppointmentSlotClaim, BlockedTime, Service, ProfessionalPrice, appointment_bounds,
+                block_bounds, block_claim_id, slot_claim_starts, BLOCK_CLAIM_PREFIX, FREE_STATUSES)
+import daily_stats
+from services import appointment_timer, commit_hooks
+from services.analytics_cache import appointment_owners
+from services.schedule_index import schedule_index
+from collections import Counter
+from datetime import datetime, timedelta
+import base64
 import uuid
 
+# Paginação por cursor (keyset) das listagens de agendamentos
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
 
-def list_appointments_for_user():
-    """Lista agendamentos do usuário atual."""
+
+class SlotUnavailableError(Exception):
+    """O horário (ou parte dele) já está reservado para o profissional."""
+
+
+def _claim_slots(appointment):
+    """Adiciona à sessão as reservas dos blocos ocupados pelo agendamento."""
+    if appointment.barbeiro_id is None or appointment.start_at is None:
+        return
+    db.session.add_all([
+        AppointmentSlotClaim(barbeiro_id=appointment.barbeiro_id, slot_start=slot,
+                             appointment_id=appointment.id)
+        for slot in slot_claim_starts(appointment.start_at, appointment.end_at)
+    ])
+
+
+# Reservas de bloqueios: um bloco já tomado por um agendamento continua dele
+_INSERT_BLOCK_CLAIMS = (db.insert(AppointmentSlotClaim)
+                        .prefix_with("IGNORE", dialect="mysql")
+                        .prefix_with("OR IGNORE", dialect="sqlite"))
+
+
+def _block_claims(block_id, barber_id, start_at, end_at, only=None):
+    slots = slot_claim_starts(start_at, end_at) if start_at and end_at > start_at else []
+    return [{"barbeiro_id": barber_id, "slot_start": slot, "appointment_id": block_claim_id(block_id)}
+            for slot in slots if only is None or slot in only]
+
+
+def _release_slots(appointment):
+    """Libera os blocos do agendamento; os que caem num bloqueio voltam para o bloqueio."""
+    AppointmentSlotClaim.query.filter_by(appointment_id=appointment.id).delete(synchronize_session=False)
+    if appointment.barbeiro_id is None or appointment.start_at is None:
+        return
+    released = set(slot_claim_starts(appointment.start_at, appointment.end_at))
+    first, last = min(released), max(released)
+    claims = []
+    for block in BlockedTime.query.filter(BlockedTime.profissional_id == appointment.barbeiro_id,
+                                          BlockedTime.data >= first.date().isoformat(),
+                                          BlockedTime.data <= last.date().isoformat()):
+        claims.extend(_block_claims(block.id, block.profissional_id,
+                                    *block_bounds(block.data, block.hora_inicio, block.hora_fim), only=released))
+    if claims:
+        db.session.execute(_INSERT_BLOCK_CLAIMS, claims)
+
+
+def _blocked(appointment):
+    """Algum bloco do agendamento está reservado por um bloqueio? (só depois de um conflito)"""
+    return db.session.execute(
+        db.select(AppointmentSlotClaim.slot_start).where(
+            AppointmentSlotClaim.barbeiro_id == appointment.barbeiro_id,
+            AppointmentSlotClaim.slot_start.in_(slot_claim_starts(appointment.start_at, appointment.end_at)),
+            AppointmentSlotClaim.appointment_id.startswith(BLOCK_CLAIM_PREFIX)
+        ).limit(1)
+    ).first() is not None
+
+
+def _commit_claims(appointment):
+    """Confirma a transação; um bloco já reservado vira SlotUnavailableError."""
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        if appointment.start_at is not None and _blocked(appointment):
+            raise SlotUnavailableError("Horário bloqueado pelo profissional")
+        raise SlotUnavailableError("Horário já agendado")
+
+
+# Bloqueios gravados pelo ORM reservam (ou liberam) os seus blocos na mesma transação
+@event.listens_for(BlockedTime, 'after_delete')
+def _release_block_claims(mapper, connection, target):
+    connection.execute(db.delete(AppointmentSlotClaim)
+                       .where(AppointmentSlotClaim.appointment_id == block_claim_id(target.id)))
+
+
+@event.listens_for(BlockedTime, 'after_insert')
+@event.listens_for(BlockedTime, 'after_update')
+def _claim_block_slots(mapper, connection, target):
+    _release_block_claims(mapper, connection, target)
+    claims = _block_claims(target.id, target.profissional_id,
+                           *block_bounds(target.data, target.hora_inicio, target.hora_fim))
+    if claims:
+        connection.execute(_INSERT_BLOCK_CLAIMS, claims)
+
+
+def _user_appointments_query():
+    """Consulta base dos agendamentos do usuário da sessão."""
     email = session.get("usuario_email")
     tipo = session.get("usuario_tipo")
     
     if tipo == "barbeiro":
         # Barbeiro vê seus próprios agendamentos
         nome = session.get("usuario_nome")
-        appointments = Appointment.query.filter_by(barbeiro=nome).all()
-    else:
-        # Cliente vê seus agendamentos
-        appointments = Appointment.query.filter_by(cliente_email=email).all()
+        return Appointment.query.filter_by(barbeiro=nome)
     
-    return [apt.to_dict() for apt in appointments]
+    # Cliente vê seus agendamentos
+    return Appointment.query.filter_by(cliente_email=email)
 
 
-def list_appointments_for_barber(barber_id, date=None):
-    """Lista agendamentos de um barbeiro específico."""
+def _barber_appointments_query(barber_id, date=None):
+    """Consulta base dos agendamentos de um barbeiro (opcionalmente de um dia)."""
     query = Appointment.query.filter_by(barbeiro_id=barber_id)
     
     if date:
         query = query.filter_by(date=date)
     
-    appointments = query.all()
+    return query
+
+
+def encode_cursor(appointment):
+    """Cursor opaco com a posição (start_at, id) de um agendamento."""
+    raw = f"{appointment.start_at.isoformat()}|{appointment.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Inverso de encode_cursor. Levanta ValueError para cursores inválidos."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        start_at, appointment_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(start_at), appointment_id
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def paginate_appointments(query, limit=None, cursor=None, direction="asc",
+                          status=None, include_total=True):
+    """Página de agendamentos ordenada por (start_at, id) usando keyset.
+    
+    ``direction`` é "asc" (mais antigos primeiro) ou "desc"; ``cursor`` é o
+    ``next_cursor`` da página anterior; ``status`` aceita um status ou uma
+    lista. A contagem total (uma consulta extra) pode ser desligada.
+    Registros sem start_at (data/hora legada inválida) não têm posição na
+    ordem e ficam fora da paginação.
+    """
+    limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+    descending = direction == "desc"
+    query = query.filter(Appointment.start_at.isnot(None))
+    
+    if status:
+        statuses = [status] if isinstance(status, str) else list(status)
+        query = query.filter(Appointment.status.in_(statuses))
+    
+    total = query.order_by(None).count() if include_total else None
+    
+    if cursor:
+        start_at, appointment_id = decode_cursor(cursor)
+        position = db.tuple_(Appointment.start_at, Appointment.id)
+        query = query.filter(position < (start_at, appointment_id) if descending
+                             else position > (start_at, appointment_id))
+    
+    if descending:
+        query = query.order_by(Appointment.start_at.desc(), Appointment.id.desc())
+    else:
+        query = query.order_by(Appointment.start_at.asc(), Appointment.id.asc())
+    
+    # Um registro a mais indica se existe próxima página
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return {
+        "data": [apt.to_dict() for apt in rows],
+        "next_cursor": encode_cursor(rows[-1]) if has_more and rows else None,
+        "has_more": has_more,
+        "limit": limit,
+        "total": total
+    }
+
+
+def list_appointments_for_user():
+    """Lista agendamentos do usuário atual."""
+    appointments = _user_appointments_query().all()
     return [apt.to_dict() for apt in appointments]
 
 
+def list_appointments_page_for_user(**page):
+    """Página (keyset) dos agendamentos do usuário atual."""
+    return paginate_appointments(_user_appointments_query(), **page)
+
+
+def list_appointments_for_barber(barber_id, date=None):
+    """Lista agendamentos de um barbeiro específico."""
+    appointments = _barber_appointments_query(barber_id, date).all()
+    return [apt.to_dict() for apt in appointments]
+
+
+def list_appointments_page_for_barber(barber_id, date=None, **page):
+    """Página (keyset) dos agendamentos de um barbeiro."""
+    return paginate_appointments(_barber_appointments_query(barber_id, date), **page)
+
+
+def get_service_duration(barber_id, service_id):
+    """Duração do serviço em minutos (a personalizada do profissional tem prioridade)."""
+    row = db.session.query(Service.duracao, ProfessionalPrice.duracao_customizada).outerjoin(
+        ProfessionalPrice,
+        db.and_(ProfessionalPrice.servico_id == Service.id,
+                ProfessionalPrice.profissional_id == barber_id)
+    ).filter(Service.id == service_id).first()
+    
+    if not row:
+        return None
+    return row.duracao_customizada or row.duracao
+
+
+def _session_client_id():
+    """Id do cliente logado (agendamentos feitos por barbeiros ficam sem cliente_id)."""
+    if session.get("usuario_tipo") == "cliente":
+        return session.get("user_id")
+    return None
+
+
 def create_appointment(data):
-    """Cria um novo agendamento."""
+    """Cria um novo agendamento.
+    
+    O agendamento e a reserva dos seus blocos são gravados na mesma transação;
+    se outro agendamento ou um bloqueio já ocupa algum bloco, levanta SlotUnavailableError.
+    """
     appointment_id = str(uuid.uuid4())
+    barber_id = int(data.get("barberId"))
+    duracao = get_service_duration(barber_id, data.get("serviceId"))
+    start_at, end_at = appointment_bounds(data.get("date"), data.get("time"), duracao)
     
     appointment = Appointment(
         id=appointment_id,
+        cliente_id=_session_client_id(),
         cliente=session.get("usuario_nome"),
         cliente_email=session.get("usuario_email"),
         barbeiro=data.get("barberName"),
-        barbeiro_id=data.get("barberId"),
+        barbeiro_id=barber_id,
         servico=data.get("serviceName"),
         servico_id=data.get("serviceId"),
         date=data.get("date"),
         time=data.get("time"),
+        start_at=start_at,
+        end_at=end_at,
         status="agendado",
         total_price=data.get("totalPrice", 0.0)
     )
     
+    # Sem leitura prévia: o INSERT das reservas recusa agendamentos e bloqueios sobrepostos
     db.session.add(appointment)
-    db.session.commit()
+    _claim_slots(appointment)
+    _commit_claims(appointment)
+    schedule_index.invalidate_appointment(appointment)
+    appointment_timer.track(appointment)
     
     return appointment.to_dict()
 
 
+def series_occurrences(date, time, every_weeks=1, count=1):
+    """Ocorrências (data, hora) de uma série: mesma hora a cada ``every_weeks`` semanas.
+
+    ValueError se ``count`` passar de MAX_SERIES_OCCURRENCES ou ``every_weeks``
+    for menor que 1; OverflowError se a série sair do calendário.
+    """
+    if not 0 < count <= Config.MAX_SERIES_OCCURRENCES or every_weeks < 1:
+        raise ValueError("Série inválida")
+    first = datetime.strptime(date, "%Y-%m-%d")
+    return [((first + timedelta(weeks=every_weeks * i)).strftime("%Y-%m-%d"), time)
+            for i in range(count)]
+
+
+def create_appointment_series(data, occurrences, skip_conflicts=True):
+    """Cria vários agendamentos do mesmo cliente/profissional/serviço de uma vez.
+    
+    As ocorrências são validadas contra as reservas existentes numa única
+    consulta e gravadas numa única transação (INSERT em lote). Retorna
+    {"created": [...], "report": [...]} com o resultado de cada ocorrência.
+    Com ``skip_conflicts=False`` nada é gravado se alguma ocorrência falhar.
+    """
+    barber_id = int(data.get("barberId"))
+    duracao = get_service_duration(barber_id, data.get("serviceId"))
+    now = datetime.now()
+    
+    report, planned = [], []
+    for date, time in occurrences:
+        entry = {"date": date, "time": time}
+        report.append(entry)
+        start_at, end_at = appointment_bounds(date, time, duracao)
+        if start_at is None:
+            entry.update(status="invalido", message="Data ou horário inválido")
+        elif start_at <= now:
+            entry.update(status="passado", message="Não é possível agendar em horários passados")
+        else:
+            planned.append((entry, start_at, end_at, slot_claim_starts(start_at, end_at)))
+    
+    for attempt in range(2):
+        # Uma consulta para todos os blocos de todas as ocorrências (agendamentos e bloqueios)
+        all_slots = [slot for _, _, _, slots in planned for slot in slots]
+        taken = dict(db.session.execute(
+            db.select(AppointmentSlotClaim.slot_start, AppointmentSlotClaim.appointment_id).where(
+                AppointmentSlotClaim.barbeiro_id == barber_id,
+                AppointmentSlotClaim.slot_start.in_(all_slots)
+            )
+        ).all()) if all_slots else {}
+        
+        appointments, claims = [], []
+        for entry, start_at, end_at, slots in planned:
+            owners = [taken[slot] for slot in slots if slot in taken]
+            if any(owner.startswith(BLOCK_CLAIM_PREFIX) for owner in owners):
+                entry.update(status="bloqueado", message="Horário bloqueado pelo profissional")
+                continue
+            if owners:
+                entry.update(status="conflito", message="Horário já agendado")
+                continue
+            appointment = Appointment(
+                id=str(uuid.uuid4()),
+                cliente_id=_session_client_id(),
+                cliente=session.get("usuario_nome"),
+                cliente_email=session.get("usuario_email"),
+                barbeiro=data.get("barberName"),
+                barbeiro_id=barber_id,
+                servico=data.get("serviceName"),
+                servico_id=data.get("serviceId"),
+                date=entry["date"],
+                time=entry["time"],
+                start_at=start_at,
+                end_at=end_at,
+                status="agendado",
+                total_price=data.get("totalPrice", 0.0),
+                created_at=datetime.utcnow().isoformat(),
+                updated_at=datetime.utcnow()
+            )
+            entry.update(status="agendado", id=appointment.id)
+            appointments.append(appointment)
+            # Ocorrências da própria série também não podem se sobrepor
+            taken.update(dict.fromkeys(slots, appointment.id))
+            claims.extend({"barbeiro_id": barber_id, "slot_start": slot, "appointment_id": appointment.id}
+                          for slot in slots)
+        
+        conflicts = [entry for entry in report if entry["status"] != "agendado"]
+        if not appointments or (conflicts and not skip_conflicts):
+            for entry in report:
+                if entry["status"] == "agendado":
+                    entry.update(status="nao_criado", message="Série não criada por causa de conflitos")
+                    entry.pop("id")
+            return {"created": [], "report": report}
+        
+        try:
+            db.session.execute(db.insert(Appointment), [_column_values(a) for a in appointments])
+            db.session.execute(db.insert(AppointmentSlotClaim), claims)
+            # INSERT em lote não dispara os eventos do ORM: a tabela de fatos é somada aqui
+            daily_stats.apply(db.session.connection(), Counter(map(daily_stats.appointment_key, appointments)))
+            commit_hooks.queue(db.session, 'analytics', *appointment_owners(barber_id, appointments[0].cliente_id))
+            db.session.commit()
+            break
+        except IntegrityError:
+            # Outro agendamento pegou um bloco entre a consulta e o INSERT: revalida uma vez
+            db.session.rollback()
+            for entry in report:
+                if entry["status"] == "agendado":
+                    del entry["status"], entry["id"]
+            if attempt:
+                raise SlotUnavailableError("Horário já agendado")
+    
+    for appointment in appointments:
+        schedule_index.invalidate_appointment(appointment)
+        appointment_timer.track(appointment)
+    
+    return {"created": [a.to_dict() for a in appointments], "report": report}
+
+
+def _column_values(model):
+    return {column.key: getattr(model, column.key) for column in model.__table__.columns}
+
+
 def cancel_appointment_by_id(appointment_id):
     """Cancela um agendamento."""
     appointment = Appointment.query.get(appointment_id)
@@ -64,46 +392,53 @@ def cancel_appointment_by_id(appointment_id):
         return False
     
     appointment.status = "cancelado"
+    _release_slots(appointment)
     db.session.commit()
+    schedule_index.invalidate_appointment(appointment)
+    appointment_timer.track(appointment)
     return True
 
 
 def update_appointment_status(appointment_id, status):
-    """Atualiza o status de um agendamento."""
+    """Atualiza o status de um agendamento (SlotUnavailableError se reativar um horário já tomado)."""
     appointment = Appointment.query.get(appointment_id)
     
     if not appointment:
         return False
     
+    was_free = appointment.status in FREE_STATUSES
     appointment.status = status
-    db.session.commit()
+    
+    # Cancelar libera os blocos; reativar um cancelado precisa reservá-los de novo
+    if status in FREE_STATUSES and not was_free:
+        _release_slots(appointment)
+    elif was_free and status not in FREE_STATUSES:
+        _claim_slots(appointment)
+    _commit_claims(appointment)
+    if was_free != (status in FREE_STATUSES):
+        schedule_index.invalidate_appointment(appointment)
+    appointment_timer.track(appointment)
     return True
 
 
 def auto_complete_past_appointments():
-    """Marca automaticamente como concluídos os agendamentos passados."""
-    now = datetime.now()
-    current_date = now.strftime("%Y-%m-%d")
-    current_time = now.strftime("%H:%M")
-    
-    # Buscar agendamentos agendados que já passaram
-    past_appointments = Appointment.query.filter(
-        Appointment.status == "agendado",
-        db.or_(
-            Appointment.date < current_date,
-            db.and_(
-                Appointment.date == current_date,
-                Appointment.time < current_time
-            )
-        )
-    ).all()
-    
-    count = 0
-    for apt in past_appointments:
-        apt.status = "concluido"
-        count += 1
-    
-    if count > 0:
-        db.session.commit()
+    """Reconciliação: conclui os agendamentos atrasados que o heap não cobriu.
     
+    As transições no horário certo são feitas por appointment_timer.fire_due;
+    esta varredura completa só pega o que escapou (outro worker caiu, reinício).
+    """
+    return appointment_timer.reconcile()
+
+
+def complete_due_appointments():
+    """Conclui os agendamentos cujo término acabou de passar (heap em memória)."""
+    return appointment_timer.fire_due()
+
+
+def purge_past_slot_claims(keep_days=1):
+    """Remove reservas de blocos que já passaram (não protegem mais nada)."""
+    count = AppointmentSlotClaim.query.filter(
+        AppointmentSlotClaim.slot_start < datetime.now() - timedelta(days=keep_days)
+    ).delete(synchronize_session=False)
+    db.session.commit()
     return count
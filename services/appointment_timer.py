@@ -0,0 +1,186 @@
+"""
+Transições de status no horário exato do término dos agendamentos.
+
+Mantém em memória um min-heap com o término (end_at) dos agendamentos
+'agendado'. O agendador consulta o topo do heap a cada segundo (sem ir ao
+banco) e conclui os que venceram, disparando os hooks registrados. A
+varredura completa do banco vira só uma reconciliação esporádica.
+
+Cada worker tem seu heap; a conclusão é um UPDATE condicional por id, então
+só um worker vence e só ele dispara os hooks.
+"""
+import heapq
+import threading
+from collections import Counter
+from datetime import datetime
+
+import daily_stats
+from db import db, Appointment, Cliente
+from services import commit_hooks
+from services.analytics_cache import appointment_owners
+
+_completed_hooks = []
+
+
+class DueHeap:
+    """Min-heap de (vencimento, id) com remoção preguiçosa."""
+
+    def __init__(self):
+        self._heap = []
+        self._due = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def schedule(self, appointment_id, due_at):
+        with self._lock:
+            self._due[appointment_id] = due_at
+            heapq.heappush(self._heap, (due_at, appointment_id))
+
+    def cancel(self, appointment_id):
+        with self._lock:
+            self._due.pop(appointment_id, None)
+
+    def reload(self, entries):
+        """Recria o heap com ``entries`` ({id: vencimento}) somado ao que já estava agendado."""
+        with self._lock:
+            self._due.update(entries)
+            self._heap = [(due_at, appointment_id) for appointment_id, due_at in self._due.items()]
+            heapq.heapify(self._heap)
+            self.loaded = True
+
+    def pop_due(self, now):
+        """Remove e retorna os ids com vencimento <= now."""
+        due_ids = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                due_at, appointment_id = heapq.heappop(self._heap)
+                # Entradas antigas (cancelado/remarcado) são ignoradas aqui
+                if self._due.get(appointment_id) == due_at:
+                    del self._due[appointment_id]
+                    due_ids.append(appointment_id)
+        return due_ids
+
+    def __len__(self):
+        return len(self._due)
+
+
+due_heap = DueHeap()
+
+
+def on_appointment_completed(func):
+    """Registra um hook chamado com o dict de cada agendamento concluído."""
+    _completed_hooks.append(func)
+    return func
+
+
+def _due_at(appointment):
+    return appointment.end_at or appointment.start_at
+
+
+def track(appointment):
+    """Atualiza o heap após criar, cancelar, remarcar ou mudar o status."""
+    due_at = _due_at(appointment)
+    if appointment.status == "agendado" and due_at:
+        due_heap.schedule(appointment.id, due_at)
+    else:
+        due_heap.cancel(appointment.id)
+
+
+def load_upcoming():
+    """Carrega no heap todos os agendamentos ainda 'agendado'."""
+    rows = db.session.execute(
+        db.select(Appointment.id, Appointment.start_at, Appointment.end_at)
+        .where(Appointment.status == "agendado", Appointment.start_at.isnot(None))
+    )
+    entries = {row.id: row.end_at or row.start_at for row in rows}
+    due_heap.reload(entries)
+    return len(entries)
+
+
+def _complete(appointment_ids, now):
+    """Conclui os ids ainda vencidos; retorna os dicts dos que este worker concluiu."""
+    completed = []
+    for appointment_id in appointment_ids:
+        # Condicional: se outro worker concluiu ou alguém remarcou, não altera nada
+        count = Appointment.query.filter(
+            Appointment.id == appointment_id,
+            Appointment.status == "agendado",
+            db.or_(Appointment.end_at <= now,
+                   db.and_(Appointment.end_at.is_(None), Appointment.start_at <= now))
+        ).update({Appointment.status: "concluido"}, synchronize_session=False)
+        if count:
+            completed.append(appointment_id)
+
+    if not completed:
+        return []
+
+    # UPDATE em lote não dispara os eventos do ORM: move a contagem de status e
+    # invalida o analytics dos envolvidos aqui
+    deltas, owners = Counter(), set()
+    for row in db.session.execute(
+        db.select(Appointment.barbeiro_id, Appointment.cliente_id, Appointment.servico_id, Appointment.start_at)
+        .where(Appointment.id.in_(completed))
+    ):
+        deltas[daily_stats.stat_key(*row[:3], "agendado", row.start_at)] -= 1
+        deltas[daily_stats.stat_key(*row[:3], "concluido", row.start_at)] += 1
+        owners.update(appointment_owners(row.barbeiro_id, row.cliente_id))
+    daily_stats.apply(db.session.connection(), deltas)
+    commit_hooks.queue(db.session, 'analytics', *owners)
+    db.session.commit()
+
+    appointments = [a.to_dict() for a in Appointment.query.filter(Appointment.id.in_(completed))]
+    for appointment in appointments:
+        for hook in _completed_hooks:
+            try:
+                hook(appointment)
+            except Exception as e:
+                print(f"⚠️  Erro no hook de conclusão ({getattr(hook, '__name__', hook)}): {e}")
+    return appointments
+
+
+def fire_due():
+    """Conclui os agendamentos cujo término já passou (tarefa de ~1s, só memória se nada venceu)."""
+    if not due_heap.loaded:
+        load_upcoming()
+
+    now = datetime.now()
+    due_ids = due_heap.pop_due(now)
+    if not due_ids:
+        return 0
+    return len(_complete(due_ids, now))
+
+
+def reconcile():
+    """Varredura completa: conclui atrasados e recarrega o heap (agendamentos de outros workers)."""
+    now = datetime.now()
+    # Faixa indexada (status, start_at); o término refina o filtro
+    overdue_ids = [row.id for row in db.session.execute(
+        db.select(Appointment.id).where(
+            Appointment.status == "agendado",
+            Appointment.start_at < now,
+            db.or_(Appointment.end_at.is_(None), Appointment.end_at <= now)
+        )
+    )]
+    for appointment_id in overdue_ids:
+        due_heap.cancel(appointment_id)
+
+    completed = _complete(overdue_ids, now) if overdue_ids else []
+    load_upcoming()
+    return len(completed)
+
+
+@on_appointment_completed
+def _invite_review(appointment):
+    """Convida o cliente a avaliar o atendimento."""
+    cliente_id = appointment.get("cliente_id")
+    if not cliente_id and appointment.get("cliente_email"):
+        # Agendamentos antigos só guardam o email do cliente
+        cliente_id = db.session.execute(
+            db.select(Cliente.id).where(Cliente.email == appointment["cliente_email"])
+        ).scalar()
+    if not cliente_id:
+        return
+    from services import notification_service
+    notification_service.notify_appointment_completed(
+        cliente_id, appointment.get("servico"), appointment.get("barbeiro")
+    )
@@ -0,0 +1,80 @@
+"""
+Cache dos horários livres calculados por (profissional, dia, duração).
+
+LRU com TTL em memória. Cada entrada guarda a versão da agenda do dia
+(schedule_index.version) do momento do cálculo; qualquer escrita que
+incrementa a versão (agendar, cancelar, mudar status, editar bloqueios ou
+expediente) torna a entrada inválida na leitura seguinte. Escritas de outros
+workers não mudam a versão local: só o TTL as cobre, por isso ele nunca passa
+do TTL do índice.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+from services.schedule_index import schedule_index
+
+
+class AvailabilityCache:
+    """LRU + TTL de listas de minutos de início livres."""
+
+    def __init__(self, max_entries=None, ttl=None):
+        self.max_entries = max_entries or Config.AVAILABILITY_CACHE_MAX_ENTRIES
+        self.ttl = min(ttl if ttl is not None else Config.AVAILABILITY_CACHE_TTL, schedule_index.ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, professional_id, day, duration):
+        """Minutos de início em cache, ou None se ausente, vencido ou de outra versão."""
+        key = (professional_id, day, duration)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            version, expires_at, starts = entry
+            if version != schedule_index.version(professional_id, day) or time.monotonic() > expires_at:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return starts
+
+    def put(self, professional_id, day, duration, starts, version):
+        """Guarda o resultado calculado sob ``version`` (capturada antes do cálculo)."""
+        with self._lock:
+            # Se a agenda mudou durante o cálculo, o resultado já nasce velho
+            if version != schedule_index.version(professional_id, day):
+                return
+            key = (professional_id, day, duration)
+            self._entries[key] = (version, time.monotonic() + self.ttl, starts)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+
+
+availability_cache = AvailabilityCache()
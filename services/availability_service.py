@@ -0,0 +1,308 @@
+"""
+Motor de disponibilidade de horários.
+
+Cada dia de um profissional é um bitmap de 1440 bits (um por minuto, num
+``int`` do Python): liga-se o expediente (WorkingHours) e desligam-se o
+intervalo, os bloqueios (BlockedTime) e os agendamentos existentes. Um
+início é livre quando os ``duração`` bits a partir dele estão todos ligados.
+
+Os dados de vários profissionais e dias são carregados com uma consulta por
+tabela, então um intervalo de datas custa o mesmo número de consultas que um
+único dia; agendamentos e bloqueios passam pelo índice em cache
+(schedule_index).
+"""
+from datetime import date, datetime, timedelta
+
+from config import Config
+from db import db, Professional, ProfessionalPrice, Service, WorkingHours, DEFAULT_DURACAO
+from services.availability_cache import availability_cache
+from services.schedule_index import DAY_MINUTES, schedule_index, span_mask, to_minutes, parse_day, iter_days
+
+# Expediente de quem ainda não configurou WorkingHours (mesma grade do agendamento)
+DEFAULT_WORKING_HOURS = ("08:00", "18:00")
+
+
+def _format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _dia_semana(day):
+    """Converte para a convenção de WorkingHours (0=Domingo ... 6=Sábado)."""
+    return (day.weekday() + 1) % 7
+
+
+def free_starts(free_mask, duration, step, first=0, earliest=0):
+    """Minutos de início (na grade ``first + k*step``) com ``duration`` minutos livres."""
+    need = (1 << duration) - 1
+    start = first
+    if earliest > start:
+        start += -(-(earliest - start) // step) * step
+    return [m for m in range(start, DAY_MINUTES - duration + 1, step)
+            if (free_mask >> m) & need == need]
+
+
+def parse_range(date_from, date_to=None):
+    """Valida o intervalo pedido: datas ISO, ordem e no máximo MAX_ADVANCE_BOOKING dias."""
+    day_from = parse_day(date_from)
+    day_to = parse_day(date_to) if date_to else day_from
+    if day_to < day_from:
+        raise ValueError("date_to deve ser igual ou posterior a date")
+    if (day_to - day_from).days >= Config.MAX_ADVANCE_BOOKING:
+        raise ValueError(f"Intervalo máximo de {Config.MAX_ADVANCE_BOOKING} dias")
+    return day_from, day_to
+
+
+def service_durations(service_id, professional_ids):
+    """Duração do serviço por profissional: {id: minutos} (a personalizada tem prioridade)."""
+    if not service_id:
+        return {pid: Config.SLOT_DURATION for pid in professional_ids}
+
+    rows = db.session.execute(
+        db.select(Service.duracao, ProfessionalPrice.profissional_id, ProfessionalPrice.duracao_customizada)
+        .outerjoin(ProfessionalPrice, db.and_(
+            ProfessionalPrice.servico_id == Service.id,
+            ProfessionalPrice.profissional_id.in_(professional_ids)
+        ))
+        .where(Service.id == service_id)
+    ).all()
+    if not rows:
+        raise LookupError("Serviço não encontrado")
+
+    base = rows[0].duracao or DEFAULT_DURACAO
+    custom = {row.profissional_id: row.duracao_customizada
+              for row in rows if row.profissional_id is not None and row.duracao_customizada}
+    return {pid: custom.get(pid, base) for pid in professional_ids}
+
+
+def _load_working_hours(professional_ids):
+    """{profissional: {dia_semana: (abre, fecha, intervalo_inicio, intervalo_fim)}}."""
+    schedules = {}
+    for row in WorkingHours.query.filter(WorkingHours.profissional_id.in_(professional_ids)):
+        week = schedules.setdefault(row.profissional_id, {})
+        if not row.ativo:
+            continue
+        week[row.dia_semana] = (
+            to_minutes(row.hora_inicio), to_minutes(row.hora_fim),
+            to_minutes(row.intervalo_inicio) if row.intervalo_inicio else None,
+            to_minutes(row.intervalo_fim) if row.intervalo_fim else None,
+        )
+    return schedules
+
+
+def _day_hours(schedules, pid, day):
+    """Expediente do profissional no dia (ou None se fechado); sem configuração, o padrão."""
+    week = schedules.get(pid)
+    if week is None:
+        return tuple(to_minutes(h) for h in DEFAULT_WORKING_HOURS) + (None, None)
+    return week.get(_dia_semana(day))
+
+
+def build_day_masks(professional_ids, day_from, day_to):
+    """Bitmaps livres por (profissional, dia) e o minuto de abertura de cada dia.
+
+    Retorna ``{(profissional, dia): (mascara_livre, abertura)}``; dias fechados
+    não aparecem. São no máximo três consultas, qualquer que seja o intervalo.
+    """
+    professional_ids = list(professional_ids)
+    if not professional_ids:
+        return {}
+
+    schedules = _load_working_hours(professional_ids)
+
+    masks = {}
+    for pid in professional_ids:
+        for day in iter_days(day_from, day_to):
+            hours = _day_hours(schedules, pid, day)
+            if not hours:
+                continue
+            opens, closes, break_start, break_end = hours
+            mask = span_mask(opens, closes)
+            if break_start is not None and break_end is not None:
+                mask &= ~span_mask(break_start, break_end)
+            masks[(pid, day)] = [mask, opens]
+
+    # Agendamentos e bloqueios vêm do índice de intervalos (em cache entre chamadas)
+    busy = schedule_index.get_many(professional_ids, day_from, day_to)
+    for key, value in masks.items():
+        value[0] &= ~busy[key].busy_mask()
+
+    return {key: tuple(value) for key, value in masks.items()}
+
+
+def _earliest_minute(day, now):
+    """Primeiro minuto agendável do dia, respeitando MIN_ADVANCE_BOOKING."""
+    earliest = now + timedelta(minutes=Config.MIN_ADVANCE_BOOKING)
+    if day < earliest.date():
+        return DAY_MINUTES
+    if day > earliest.date():
+        return 0
+    return earliest.hour * 60 + earliest.minute + (1 if earliest.second or earliest.microsecond else 0)
+
+
+def free_starts_by_day(durations, day_from, day_to, now=None):
+    """{(profissional, dia): [minutos de início]} para ``durations`` ({profissional: minutos}).
+
+    Dias em cache (availability_cache) não são recalculados; os demais saem de
+    uma única montagem de bitmaps. A antecedência mínima é aplicada na leitura,
+    então o cache guarda o dia inteiro e continua válido ao longo do dia.
+    """
+    now = now or datetime.now()
+    result, missing = {}, {}
+    for pid, duration in durations.items():
+        for day in iter_days(day_from, day_to):
+            starts = availability_cache.get(pid, day, duration)
+            if starts is None:
+                missing.setdefault(pid, []).append(day)
+            else:
+                result[(pid, day)] = starts
+
+    if missing:
+        # Versões capturadas antes da leitura: escrita concorrente não fica em cache
+        versions = {(pid, day): schedule_index.version(pid, day)
+                    for pid, days in missing.items() for day in days}
+        first = min(day for _, day in versions)
+        last = max(day for _, day in versions)
+        masks = build_day_masks(missing.keys(), first, last)
+        for (pid, day), version in versions.items():
+            free_mask, opens = masks.get((pid, day), (0, 0))
+            starts = free_starts(free_mask, durations[pid], Config.SLOT_DURATION, opens) if free_mask else []
+            availability_cache.put(pid, day, durations[pid], starts, version)
+            result[(pid, day)] = starts
+
+    for (pid, day), starts in result.items():
+        earliest = _earliest_minute(day, now)
+        if earliest:
+            result[(pid, day)] = [m for m in starts if m >= earliest]
+    return result
+
+
+def grid_starts(hours, duration, step):
+    """Inícios da grade do expediente em que o serviço cabe fora do intervalo."""
+    opens, closes, break_start, break_end = hours
+    return [m for m in range(opens, closes - duration + 1, step)
+            if break_start is None or break_end is None or m + duration <= break_start or m >= break_end]
+
+
+def slot_grid(professional_id, duration, starts, day_from, day_to, now=None):
+    """{'YYYY-MM-DD': [{'time', 'status'}]} com todos os inícios do expediente.
+
+    ``starts`` é o resultado de free_starts_by_day. Status: "livre";
+    "indisponivel" antes da antecedência mínima; "ocupado" (agendamento ou
+    bloqueio) no resto.
+    """
+    now = now or datetime.now()
+    schedules = _load_working_hours([professional_id])
+    grid = {}
+    for day in iter_days(day_from, day_to):
+        hours = _day_hours(schedules, professional_id, day)
+        free = set(starts[(professional_id, day)])
+        earliest = _earliest_minute(day, now)
+        grid[day.isoformat()] = [
+            {"time": _format_minutes(m),
+             "status": "livre" if m in free else "indisponivel" if m < earliest else "ocupado"}
+            for m in (grid_starts(hours, duration, Config.SLOT_DURATION) if hours else ())
+        ]
+    return grid
+
+
+def get_availability(professional_id, service_id=None, date_from=None, date_to=None):
+    """Horários de um profissional para um serviço.
+
+    ``slots`` traz só os livres ({'YYYY-MM-DD': ['HH:MM', ...]}); ``grid`` traz
+    a grade do expediente com o status de cada horário (ver slot_grid).
+    """
+    day_from, day_to = parse_range(date_from or date.today().isoformat(), date_to)
+    if db.session.get(Professional, professional_id) is None:
+        raise LookupError("Profissional não encontrado")
+    duration = service_durations(service_id, [professional_id])[professional_id]
+    now = datetime.now()
+    starts = free_starts_by_day({professional_id: duration}, day_from, day_to, now)
+
+    availability = {}
+    for day in iter_days(day_from, day_to):
+        availability[day.isoformat()] = [_format_minutes(m) for m in starts[(professional_id, day)]]
+
+    return {
+        "professional_id": professional_id,
+        "service_id": service_id,
+        "duracao": duration,
+        "slots": availability,
+        "grid": slot_grid(professional_id, duration, starts, day_from, day_to, now),
+    }
+
+
+def _service_offers(service_id):
+    """Profissionais ativos que atendem o serviço, com duração e preço de cada um (uma consulta)."""
+    rows = db.session.execute(
+        db.select(Professional.id, Professional.nome, Service.duracao, Service.preco,
+                  ProfessionalPrice.duracao_customizada, ProfessionalPrice.preco.label("preco_profissional"),
+                  ProfessionalPrice.ativo.label("preco_ativo"))
+        .select_from(Professional)
+        .join(Service, Service.id == service_id)
+        .outerjoin(ProfessionalPrice, db.and_(ProfessionalPrice.profissional_id == Professional.id,
+                                              ProfessionalPrice.servico_id == service_id))
+        .where(Professional.ativo.isnot(False))
+        .order_by(Professional.id)
+    ).all()
+
+    offers = {}
+    for row in rows:
+        # Quem desativou o serviço na própria tabela de preços não o oferece
+        if row.preco_ativo is False:
+            continue
+        offers[row.id] = {
+            "nome": row.nome,
+            "duracao": row.duracao_customizada or row.duracao or DEFAULT_DURACAO,
+            "preco": row.preco_profissional if row.preco_profissional is not None else row.preco,
+        }
+    return offers
+
+
+def find_first_available(service_id, limit=5, date_from=None, days=None):
+    """Os ``limit`` primeiros horários livres do serviço com qualquer profissional ativo.
+
+    Busca em blocos de FIRST_AVAILABLE_CHUNK_DAYS dias (no máximo três consultas
+    por bloco para todos os profissionais, nenhuma se o bloco estiver em cache)
+    e para assim que encontra ``limit`` horários, até MAX_ADVANCE_BOOKING dias.
+    """
+    days = max(1, min(days or Config.MAX_ADVANCE_BOOKING, Config.MAX_ADVANCE_BOOKING))
+    day_from, _ = parse_range(date_from or date.today().isoformat())
+    last_day = day_from + timedelta(days=days - 1)
+
+    offers = _service_offers(service_id)
+    if not offers:
+        if db.session.get(Service, service_id) is None:
+            raise LookupError("Serviço não encontrado")
+        return []
+
+    now = datetime.now()
+    durations = {pid: offer["duracao"] for pid, offer in offers.items()}
+    found = []
+    chunk_start = day_from
+    while chunk_start <= last_day and len(found) < limit:
+        chunk_end = min(chunk_start + timedelta(days=Config.FIRST_AVAILABLE_CHUNK_DAYS - 1), last_day)
+        starts = free_starts_by_day(durations, chunk_start, chunk_end, now)
+
+        for day in iter_days(chunk_start, chunk_end):
+            day_slots = []
+            for pid in offers:
+                for minute in starts[(pid, day)]:
+                    day_slots.append((minute, pid))
+            # Dias são percorridos em ordem; dentro do dia, por horário e profissional
+            day_slots.sort()
+            for minute, pid in day_slots[:limit - len(found)]:
+                offer = offers[pid]
+                found.append({
+                    "professional_id": pid,
+                    "professional_nome": offer["nome"],
+                    "date": day.isoformat(),
+                    "time": _format_minutes(minute),
+                    "duracao": offer["duracao"],
+                    "preco": offer["preco"],
+                })
+            if len(found) >= limit:
+                break
+
+        chunk_start = chunk_end + timedelta(days=1)
+
+    return found
@@ -0,0 +1,209 @@
+"""
+Feed iCalendar (.ics) da agenda de cada profissional.
+
+Aplicativos de calendário consultam o feed a cada poucos minutos. Cada
+profissional tem um ETag em memória: enquanto ele for válido e não houver
+escrita local na agenda, uma consulta com If-None-Match vira 304 sem ir ao
+banco. Vencido o ETAG_TTL (que cobre escritas de outros workers), o ETag é
+recalculado com uma única agregação indexada; o arquivo só é gerado, em
+streaming, quando algo mudou.
+"""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from config import Config
+from database_config import get_pool
+from db import db, Appointment, CalendarFeedToken
+from query_metrics import InstrumentedSSDictCursor
+from services import commit_hooks
+from services.export_service import ExportStream, CHUNK_ROWS
+
+PRODID = "-//Corte Digital//Agenda//PT-BR"
+
+_feed_versions = {}
+_feed_etags = {}
+_lock = threading.Lock()
+
+
+def feed_token(professional_id, rotate=False):
+    """Token do link do feed (apps de calendário não enviam o cookie de sessão).
+
+    Gerado aleatoriamente na primeira vez e guardado em calendar_feed_tokens;
+    ``rotate=True`` gera outro e revoga o link anterior.
+    """
+    record = db.session.get(CalendarFeedToken, professional_id)
+    if record is None:
+        record = CalendarFeedToken(profissional_id=professional_id)
+        db.session.add(record)
+    elif not rotate:
+        return record.token
+    record.token = secrets.token_urlsafe(32)
+    record.created_at = datetime.utcnow()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outra requisição criou o token ao mesmo tempo: vale o dela
+        db.session.rollback()
+        return db.session.get(CalendarFeedToken, professional_id).token
+    return record.token
+
+
+def check_feed_token(professional_id, token):
+    """Sem token gerado para o profissional, nenhum link é aceito."""
+    if not token:
+        return False
+    record = db.session.get(CalendarFeedToken, professional_id)
+    return record is not None and hmac.compare_digest(record.token, token)
+
+
+def _feed_window():
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return (today - timedelta(days=Config.ICS_PAST_DAYS),
+            today + timedelta(days=Config.MAX_ADVANCE_BOOKING + 1))
+
+
+def bump(professional_id):
+    """Marca a agenda do profissional como alterada neste processo."""
+    with _lock:
+        _feed_versions[professional_id] = _feed_versions.get(professional_id, 0) + 1
+
+
+def feed_etag(professional_id):
+    """ETag atual do feed; recalculado só após escrita local ou ICS_ETAG_TTL."""
+    now = time.monotonic()
+    with _lock:
+        version = _feed_versions.get(professional_id, 0)
+        cached = _feed_etags.get(professional_id)
+        if cached and cached[0] == version and now - cached[1] < Config.ICS_ETAG_TTL:
+            return cached[2]
+
+    window_start, window_end = _feed_window()
+    conn = get_pool().acquire()
+    try:
+        with conn.cursor() as cursor:
+            # Faixa indexada (barbeiro_id, start_at)
+            cursor.execute("""
+                SELECT COUNT(*) as total, MAX(updated_at) as changed, MAX(start_at) as last_start
+                FROM appointments
+                WHERE barbeiro_id = %s AND start_at >= %s AND start_at < %s
+            """, (professional_id, window_start, window_end))
+            row = cursor.fetchone()
+    finally:
+        conn.close()
+
+    raw = f"{professional_id}|{window_start.date()}|{row['total']}|{row['changed']}|{row['last_start']}"
+    etag = hashlib.sha256(raw.encode()).hexdigest()[:32]
+    with _lock:
+        # Escrita durante o cálculo: não guarda (a próxima consulta recalcula)
+        if _feed_versions.get(professional_id, 0) == version:
+            _feed_etags[professional_id] = (version, now, etag)
+    return etag
+
+
+def _escape(value):
+    text = str(value or "")
+    return (text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _fold(line):
+    """Quebra linhas acima de 75 octetos (RFC 5545, 3.1)."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, current = [], b""
+    for char in line:
+        piece = char.encode("utf-8")
+        if len(current) + len(piece) > (75 if not parts else 74):
+            parts.append(current.decode("utf-8"))
+            current = b""
+        current += piece
+    parts.append(current.decode("utf-8"))
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _format_datetime(value):
+    return value.strftime("%Y%m%dT%H%M%S")
+
+
+def _event_lines(row, stamp):
+    description = f"Status: {row['status']}"
+    if row["cliente_email"]:
+        description += f"\nCliente: {row['cliente_email']}"
+    if row["observacoes"]:
+        description += f"\nObservações: {row['observacoes']}"
+
+    end_at = row["end_at"] or row["start_at"] + timedelta(minutes=30)
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{row['id']}@corte-digital",
+        f"DTSTAMP:{_format_datetime(row['updated_at'] or stamp)}Z",
+        f"DTSTART:{_format_datetime(row['start_at'])}",
+        f"DTEND:{_format_datetime(end_at)}",
+        f"SUMMARY:{_escape(row['servico'])} - {_escape(row['cliente'])}",
+        f"DESCRIPTION:{_escape(description)}",
+        f"STATUS:{'CANCELLED' if row['status'] == 'cancelado' else 'CONFIRMED'}",
+        "END:VEVENT",
+    ]
+    return "".join(_fold(line) for line in lines)
+
+
+def _ics_chunks(cursor, name):
+    stamp = datetime.utcnow()
+    yield "".join(_fold(line) for line in [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+        f"X-PUBLISHED-TTL:PT{max(Config.ICS_ETAG_TTL // 60, 1)}M",
+    ])
+
+    events = []
+    for row in cursor:
+        events.append(_event_lines(row, stamp))
+        if len(events) == CHUNK_ROWS:
+            yield "".join(events)
+            events = []
+    events.append(_fold("END:VCALENDAR"))
+    yield "".join(events)
+
+
+def open_feed(professional_id, name="Agenda"):
+    """Executa a consulta da janela do feed e retorna o ExportStream do arquivo."""
+    window_start, window_end = _feed_window()
+    conn = get_pool().acquire()
+    try:
+        cursor = conn.cursor(InstrumentedSSDictCursor)
+        cursor.execute("""
+            SELECT id, cliente, cliente_email, servico, status, observacoes,
+                   start_at, end_at, updated_at
+            FROM appointments
+            WHERE barbeiro_id = %s AND start_at >= %s AND start_at < %s
+            ORDER BY start_at, id
+        """, (professional_id, window_start, window_end))
+    except Exception:
+        conn.discard()
+        raise
+
+    return ExportStream(conn, cursor, _ics_chunks(cursor, name))
+
+
+# Escritas pelo ORM em agendamentos mudam o feed do profissional após o commit
+@commit_hooks.on_commit('calendar_feed')
+def _apply_feed_changes(professional_ids):
+    for professional_id in professional_ids:
+        bump(professional_id)
+
+
+commit_hooks.watch(
+    (Appointment,), 'calendar_feed',
+    lambda target: [int(target.barbeiro_id)] if target.barbeiro_id is not None else []
+)
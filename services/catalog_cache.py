@@ -0,0 +1,85 @@
+"""
+Cache do catálogo público (serviços e profissionais).
+
+O catálogo muda raramente e é lido em toda abertura da tela de agendamento.
+Cada entrada guarda o corpo JSON já serializado e o ETag forte (hash do
+corpo), então uma leitura em cache não consulta o banco nem serializa nada.
+Escritas pelo ORM em serviços, profissionais ou preços invalidam o catálogo
+depois do commit; o TTL cobre escritas feitas por outros workers.
+"""
+import hashlib
+import threading
+import time
+
+from flask import current_app
+
+from config import Config
+from db import Professional, ProfessionalPrice, Service
+from services import commit_hooks
+
+
+class CatalogEntry:
+    __slots__ = ('body', 'etag', 'expires_at')
+
+    def __init__(self, body, expires_at):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.expires_at = expires_at
+
+
+class CatalogCache:
+    """Corpos JSON serializados por nome, com TTL e versão."""
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else Config.CATALOG_CACHE_TTL
+        self._entries = {}
+        self._version = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, build):
+        """CatalogEntry de ``name``; ``build()`` gera o payload quando ausente ou vencido."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and now < entry.expires_at:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            version = self._version
+
+        body = current_app.json.dumps(build()).encode()
+        entry = CatalogEntry(body, now + self.ttl)
+        with self._lock:
+            # Catálogo alterado durante a leitura: devolve, mas não guarda
+            if self._version == version:
+                self._entries[name] = entry
+        return entry
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": sorted(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+
+
+catalog_cache = CatalogCache()
+
+
+# Serviços, profissionais e preços alterados pelo ORM invalidam o catálogo
+@commit_hooks.on_commit('catalog')
+def _apply_catalog_changes(_):
+    catalog_cache.invalidate()
+
+
+commit_hooks.watch((Service, Professional, ProfessionalPrice), 'catalog', lambda target: ['catalog'])
@@ -0,0 +1,58 @@
+"""
+Ações adiadas para depois do commit da sessão do SQLAlchemy.
+
+Caches em memória precisam ser invalidados quando o ORM grava certos
+modelos, mas só depois do commit: invalidar no flush deixaria outra
+requisição recarregar o dado antigo antes da transação terminar. Os eventos
+de mapper enfileiram chaves em ``session.info`` e o handler registrado
+recebe o conjunto de chaves no ``after_commit`` (descartado no rollback).
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+_handlers = {}
+
+
+def _pending_key(name):
+    return f'_after_commit:{name}'
+
+
+def queue(session, name, *keys):
+    """Enfileira ``keys`` para o handler ``name`` no próximo commit da sessão."""
+    if session is not None:
+        session.info.setdefault(_pending_key(name), set()).update(keys)
+
+
+def on_commit(name):
+    """Decorador: registra ``handler(keys)``, chamado após cada commit com chaves enfileiradas."""
+    def register(handler):
+        _handlers[name] = handler
+        return handler
+    return register
+
+
+def watch(models, name, keys_for):
+    """Enfileira ``keys_for(target)`` para ``name`` em insert/update/delete dos ``models``.
+
+    Subclasses (aliases como Barber/BarberPrice) também são observadas.
+    """
+    def _queue_change(mapper, connection, target):
+        queue(object_session(target), name, *keys_for(target))
+
+    for model in models:
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, _queue_change, propagate=True)
+
+
+@event.listens_for(Session, 'after_commit')
+def _run_handlers(session):
+    for name, handler in _handlers.items():
+        keys = session.info.pop(_pending_key(name), None)
+        if keys:
+            handler(keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending(session):
+    for name in _handlers:
+        session.info.pop(_pending_key(name), None)
@@ -0,0 +1,130 @@
+"""
+Exportação de agendamentos (CSV / NDJSON) em streaming
+Usa cursor no servidor (SSCursor): a memória fica constante qualquer que seja o histórico
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from database_config import get_pool
+from query_metrics import InstrumentedSSDictCursor
+
+EXPORT_COLUMNS = [
+    'id', 'date', 'time', 'start_at', 'end_at', 'cliente', 'cliente_email',
+    'servico', 'status', 'total_price', 'observacoes'
+]
+
+# Linhas acumuladas por bloco enviado ao cliente
+CHUNK_ROWS = 500
+
+
+def _parse_day(value):
+    """Converte 'YYYY-MM-DD' em datetime (ValueError se inválido)."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f"Data inválida: {value}")
+
+
+def _format_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(cursor):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    rows = 0
+    for row in cursor:
+        writer.writerow([_format_value(row[column]) for column in EXPORT_COLUMNS])
+        rows += 1
+        if rows % CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _ndjson_chunks(cursor):
+    lines = []
+    for row in cursor:
+        lines.append(json.dumps({column: _format_value(row[column]) for column in EXPORT_COLUMNS},
+                                ensure_ascii=False))
+        if len(lines) == CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+class ExportStream:
+    """Iterável da resposta; o servidor WSGI chama ``close()`` ao terminar (ou abortar)."""
+
+    def __init__(self, conn, cursor, chunks):
+        self._conn = conn
+        self._cursor = cursor
+        self._chunks = chunks
+        self._finished = False
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            yield chunk
+        self._finished = True
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        if self._finished:
+            self._cursor.close()
+            conn.close()
+        else:
+            # Download interrompido: descartar evita ler o restante das linhas
+            conn.discard()
+
+
+def open_appointments_export(barbeiro_id, date_from=None, date_to=None, statuses=None, fmt='csv'):
+    """Executa a consulta e retorna um ExportStream com os blocos do arquivo.
+
+    A consulta roda já na chamada (erros aparecem ainda dentro da requisição);
+    as linhas são lidas sob demanda enquanto a resposta é enviada. A conexão
+    é própria (fora do escopo da requisição, que termina antes do streaming).
+    """
+    if fmt not in ('csv', 'ndjson'):
+        raise ValueError("Formato inválido (use csv ou ndjson)")
+
+    query = f"""
+        SELECT {', '.join(EXPORT_COLUMNS)}
+        FROM appointments
+        WHERE barbeiro_id = %s
+    """
+    params = [barbeiro_id]
+
+    if date_from:
+        query += " AND start_at >= %s"
+        params.append(_parse_day(date_from))
+    if date_to:
+        query += " AND start_at < %s"
+        params.append(_parse_day(date_to) + timedelta(days=1))
+    if statuses:
+        query += f" AND status IN ({', '.join(['%s'] * len(statuses))})"
+        params.extend(statuses)
+
+    query += " ORDER BY start_at, id"
+
+    conn = get_pool().acquire()
+    cursor = conn.cursor(InstrumentedSSDictCursor)
+    try:
+        cursor.execute(query, params)
+    except Exception:
+        conn.discard()
+        raise
+
+    chunks = _csv_chunks(cursor) if fmt == 'csv' else _ndjson_chunks(cursor)
+    return ExportStream(conn, cursor, chunks)
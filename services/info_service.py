@@ -1,12 +1,13 @@
 """Serviço de informações gerais (barbeiros, serviços, notificações, relatórios)."""
-from db import db, Barber, Service, Appointment
+from db import db, Professional, ProfessionalPrice, Service, DEFAULT_DURACAO
 from datetime import datetime, timedelta
+from database_config import get_database_connection, tolerates_replica_lag
+from read_models import list_professional_summaries
 
 
 def list_barbers():
-    """Lista todos os barbeiros."""
-    barbers = Barber.query.all()
-    return [barber.to_dict() for barber in barbers]
+    """Lista todos os barbeiros (projeção enxuta, sem os campos longos do perfil)."""
+    return [barber.to_dict() for barber in list_professional_summaries()]
 
 
 def list_services():
@@ -15,36 +16,91 @@ def list_services():
     return [service.to_dict() for service in services]
 
 
+def booking_bootstrap():
+    """Catálogo da tela de agendamento: serviços, profissionais ativos e tabela efetiva de cada um.
+
+    Três consultas (serviços, profissionais, preços personalizados), quaisquer
+    que sejam os números de profissionais e serviços. Em ``servicos`` de cada
+    profissional estão só os serviços que ele oferece, com preço e duração já
+    resolvidos (o personalizado tem prioridade sobre o do serviço).
+    """
+    services = Service.query.filter(Service.ativo.isnot(False)).order_by(Service.id).all()
+    professionals = list_professional_summaries(Professional.ativo.isnot(False))
+    professional_ids = [professional.id for professional in professionals]
+
+    custom = {}
+    if professional_ids:
+        rows = db.session.execute(
+            db.select(ProfessionalPrice.profissional_id, ProfessionalPrice.servico_id,
+                      ProfessionalPrice.preco, ProfessionalPrice.duracao_customizada,
+                      ProfessionalPrice.ativo)
+            .where(ProfessionalPrice.profissional_id.in_(professional_ids))
+        )
+        for row in rows:
+            custom[(row.profissional_id, row.servico_id)] = row
+
+    result = []
+    for professional in professionals:
+        table = {}
+        for service in services:
+            price = custom.get((professional.id, service.id))
+            if price is None:
+                table[service.id] = {"preco": service.preco, "duracao": service.duracao or DEFAULT_DURACAO}
+            elif price.ativo is not False:
+                table[service.id] = {
+                    "preco": price.preco if price.preco is not None else service.preco,
+                    "duracao": price.duracao_customizada or service.duracao or DEFAULT_DURACAO,
+                }
+        data = professional.to_dict()
+        data["servicos"] = table
+        result.append(data)
+
+    return {
+        "services": [service.to_dict() for service in services],
+        "professionals": result,
+    }
+
+
 def list_notifications():
     """Lista notificações (placeholder - implementar conforme necessário)."""
     # TODO: Implementar sistema de notificações
     return []
 
 
+@tolerates_replica_lag()
 def report_week():
     """Gera relatório da semana."""
     # Calcular data de início da semana (7 dias atrás)
     today = datetime.now()
     week_ago = today - timedelta(days=7)
     week_ago_str = week_ago.strftime("%Y-%m-%d")
+    week_start = week_ago.replace(hour=0, minute=0, second=0, microsecond=0)
     
-    # Buscar agendamentos da semana
-    appointments = Appointment.query.filter(Appointment.date >= week_ago_str).all()
-    
-    # Calcular estatísticas
-    total_appointments = len(appointments)
-    completed = len([a for a in appointments if a.status == "concluido"])
-    cancelled = len([a for a in appointments if a.status == "cancelado"])
-    pending = len([a for a in appointments if a.status == "agendado"])
+    conn = get_database_connection()
+    cursor = conn.cursor()
     
-    # Calcular receita (apenas agendamentos concluídos)
-    revenue = sum(a.total_price or 0 for a in appointments if a.status == "concluido")
+    try:
+        # Estatísticas agregadas no banco (lidas da réplica quando houver)
+        cursor.execute("""
+            SELECT
+                COUNT(*) as total_appointments,
+                COALESCE(SUM(status = 'concluido'), 0) as completed,
+                COALESCE(SUM(status = 'cancelado'), 0) as cancelled,
+                COALESCE(SUM(status = 'agendado'), 0) as pending,
+                COALESCE(SUM(CASE WHEN status = 'concluido' THEN total_price ELSE 0 END), 0) as revenue
+            FROM appointments
+            WHERE start_at >= %s
+        """, (week_start,))
+        result = cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
     
     return {
         "period": f"{week_ago_str} até {today.strftime('%Y-%m-%d')}",
-        "total_appointments": total_appointments,
-        "completed": completed,
-        "cancelled": cancelled,
-        "pending": pending,
-        "revenue": revenue
+        "total_appointments": int(result["total_appointments"]),
+        "completed": int(result["completed"]),
+        "cancelled": int(result["cancelled"]),
+        "pending": int(result["pending"]),
+        "revenue": float(result["revenue"])
     }
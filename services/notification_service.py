@@ -236,6 +236,18 @@ def notify_appointment_reminder(cliente_id, servico, data_hora):
     )
 
 
+def notify_appointment_completed(cliente_id, servico, barbeiro):
+    """Convida o cliente a avaliar o atendimento concluído"""
+    return create_notification(
+        user_id=cliente_id,
+        user_type='cliente',
+        notif_type='avaliacao',
+        title='Como foi seu atendimento?',
+        message=f'Avalie {servico} com {barbeiro}',
+        link='/cliente#agendamentos'
+    )
+
+
 def notify_new_message(user_id, user_type, sender_name):
     """Notifica sobre nova mensagem no chat"""
     return create_notification(
@@ -3,7 +3,14 @@ Serviço de Avaliações e Reviews
 Sistema de estrelas e comentários
 """
 from datetime import datetime
-from database_config import get_database_connection
+from database_config import get_database_connection, tolerates_replica_lag, call_after_commit
+from services.analytics_cache import analytics_cache, appointment_owners
+
+
+def _invalidate_analytics(barbeiro_id, cliente_id):
+    """Descarta o analytics em cache do barbeiro e do cliente quando a escrita for confirmada."""
+    owners = appointment_owners(barbeiro_id, cliente_id)
+    call_after_commit(lambda: analytics_cache.invalidate(*owners))
 
 
 def create_reviews_table():
@@ -65,6 +72,7 @@ def create_review(appointment_id, barbeiro_id, cliente_id, rating, comment=''):
         
         conn.commit()
         review_id = cursor.lastrowid
+        _invalidate_analytics(barbeiro_id, cliente_id)
         
         # Retorna avaliação criada
         cursor.execute("""
@@ -90,6 +98,12 @@ def create_review(appointment_id, barbeiro_id, cliente_id, rating, comment=''):
         conn.close()
 
 
+def _review_barbeiro(cursor, review_id):
+    cursor.execute("SELECT barbeiro_id FROM reviews WHERE id = %s", (review_id,))
+    row = cursor.fetchone()
+    return row['barbeiro_id'] if row else None
+
+
 def update_review(review_id, cliente_id, rating, comment=''):
     """Atualiza uma avaliação existente"""
     conn = get_database_connection()
@@ -101,10 +115,12 @@ def update_review(review_id, cliente_id, rating, comment=''):
             SET rating = %s, comment = %s
             WHERE id = %s AND cliente_id = %s
         """, (rating, comment, review_id, cliente_id))
+        updated = cursor.rowcount
         
         conn.commit()
         
-        if cursor.rowcount > 0:
+        if updated > 0:
+            _invalidate_analytics(_review_barbeiro(cursor, review_id), cliente_id)
             return {'success': True}
         else:
             return {'success': False, 'message': 'Avaliação não encontrada'}
@@ -123,6 +139,7 @@ def delete_review(review_id, cliente_id):
     cursor = conn.cursor()
     
     try:
+        barbeiro_id = _review_barbeiro(cursor, review_id)
         cursor.execute("""
             DELETE FROM reviews
             WHERE id = %s AND cliente_id = %s
@@ -131,6 +148,7 @@ def delete_review(review_id, cliente_id):
         conn.commit()
         
         if cursor.rowcount > 0:
+            _invalidate_analytics(barbeiro_id, cliente_id)
             return {'success': True}
         else:
             return {'success': False, 'message': 'Avaliação não encontrada'}
@@ -297,6 +315,7 @@ def get_pending_reviews(cliente_id):
         conn.close()
 
 
+@tolerates_replica_lag()
 def get_top_rated_barbers(limit=10):
     """Obtém barbeiros mais bem avaliados"""
     conn = get_database_connection()
@@ -0,0 +1,264 @@
+"""
+Índice de intervalos ocupados por profissional e dia.
+
+Cada (profissional, dia) vira uma lista ordenada de intervalos [início, fim)
+em minutos, já mesclados, com agendamentos ativos e bloqueios (BlockedTime).
+Serve às leituras de disponibilidade; a gravação de um agendamento não o
+consulta (a reserva de blocos em appointment_slot_claims decide).
+
+Os dias ficam num cache LRU em memória. Toda escrita que muda a agenda de um
+profissional dá uma versão nova ao dia (ou ao profissional inteiro) e a
+entrada antiga deixa de valer; o TTL cobre escritas feitas por outros workers.
+As versões vêm de um contador que só cresce e são esquecidas um TTL depois da
+última escrita: qualquer leitura anterior a ela já terá vencido.
+"""
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import inspect
+
+from config import Config
+from db import db, Appointment, BlockedTime, WorkingHours, DEFAULT_DURACAO, FREE_STATUSES
+from services import commit_hooks
+
+DAY_MINUTES = 24 * 60
+
+
+def to_minutes(hhmm):
+    hours, minutes = hhmm.split(":")[:2]
+    return int(hours) * 60 + int(minutes)
+
+
+def parse_day(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Data inválida: {value}")
+
+
+def iter_days(day_from, day_to):
+    day = day_from
+    while day <= day_to:
+        yield day
+        day += timedelta(days=1)
+
+
+def span_mask(start, end):
+    """Bits ligados nos minutos [start, end) do dia."""
+    start, end = max(start, 0), min(end, DAY_MINUTES)
+    if end <= start:
+        return 0
+    return ((1 << (end - start)) - 1) << start
+
+
+def day_spans(start_at, end_at):
+    """Divide [start_at, end_at) em (dia, início, fim) em minutos do próprio dia."""
+    day = start_at.date()
+    while datetime.combine(day, datetime.min.time()) < end_at:
+        midnight = datetime.combine(day, datetime.min.time())
+        start = max(int((start_at - midnight).total_seconds() // 60), 0)
+        end = min(-(-int((end_at - midnight).total_seconds()) // 60), DAY_MINUTES)
+        yield day, start, end
+        day += timedelta(days=1)
+
+
+def load_blocks(professional_ids, day_from, day_to):
+    """[(profissional, dia, início, fim)] dos bloqueios no intervalo."""
+    rows = db.session.execute(
+        db.select(BlockedTime.profissional_id, BlockedTime.data,
+                  BlockedTime.hora_inicio, BlockedTime.hora_fim)
+        .where(BlockedTime.profissional_id.in_(professional_ids),
+               BlockedTime.data >= day_from.isoformat(),
+               BlockedTime.data <= day_to.isoformat())
+    )
+    return [(row.profissional_id, parse_day(row.data),
+             to_minutes(row.hora_inicio), to_minutes(row.hora_fim)) for row in rows]
+
+
+def load_bookings(professional_ids, day_from, day_to):
+    """[(profissional, início, fim)] dos agendamentos que ocupam o intervalo."""
+    range_start = datetime.combine(day_from, datetime.min.time())
+    range_end = datetime.combine(day_to + timedelta(days=1), datetime.min.time())
+    rows = db.session.execute(
+        db.select(Appointment.barbeiro_id, Appointment.start_at, Appointment.end_at)
+        .where(Appointment.barbeiro_id.in_(professional_ids),
+               Appointment.status.notin_(FREE_STATUSES),
+               # Faixa indexada (barbeiro_id, start_at); um dia antes cobre quem atravessa a meia-noite
+               Appointment.start_at >= range_start - timedelta(days=1),
+               Appointment.start_at < range_end)
+    )
+    bookings = []
+    for row in rows:
+        end_at = row.end_at or row.start_at + timedelta(minutes=DEFAULT_DURACAO)
+        if end_at > range_start:
+            bookings.append((row.barbeiro_id, row.start_at, end_at))
+    return bookings
+
+
+class DayIntervals:
+    """Intervalos ocupados de um dia, ordenados e mesclados."""
+    __slots__ = ('starts', 'ends', 'version', 'loaded_at')
+
+    def __init__(self, intervals, version=None, loaded_at=0.0):
+        self.starts, self.ends = [], []
+        for start, end in sorted(intervals):
+            if end <= start:
+                continue
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+        self.version = version
+        self.loaded_at = loaded_at
+
+    def busy_mask(self):
+        mask = 0
+        for start, end in zip(self.starts, self.ends):
+            mask |= span_mask(start, end)
+        return mask
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class ScheduleIndex:
+    """Cache LRU de DayIntervals por (profissional, dia), versionado."""
+
+    def __init__(self, max_days=None, ttl=None):
+        self.max_days = max_days or Config.SCHEDULE_INDEX_MAX_DAYS
+        self.ttl = ttl if ttl is not None else Config.SCHEDULE_INDEX_TTL
+        self._days = OrderedDict()
+        self._day_versions = {}
+        self._professional_versions = {}
+        self._written_at = OrderedDict()  # (é dia?, chave) -> última escrita, mais antigas à esquerda
+        self._clock = itertools.count(1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, professional_id, day):
+        """Versão atual da agenda do profissional no dia (muda a cada escrita)."""
+        return (self._professional_versions.get(professional_id, 0),
+                self._day_versions.get((professional_id, day), 0))
+
+    def _cached(self, key, now):
+        entry = self._days.get(key)
+        if entry is None:
+            return None
+        if entry.version != self.version(*key) or now - entry.loaded_at > self.ttl:
+            del self._days[key]
+            return None
+        self._days.move_to_end(key)
+        return entry
+
+    def get_many(self, professional_ids, day_from, day_to):
+        """{(profissional, dia): DayIntervals}; os dias ausentes são carregados juntos."""
+        professional_ids = list(professional_ids)
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for pid in professional_ids:
+                for day in iter_days(day_from, day_to):
+                    entry = self._cached((pid, day), now)
+                    if entry is None:
+                        missing.append((pid, day))
+                    else:
+                        found[(pid, day)] = entry
+            self.hits += len(found)
+            self.misses += len(missing)
+            versions = {key: self.version(*key) for key in missing}
+
+        if missing:
+            found.update(self._load(missing, versions, now))
+        return found
+
+    def _load(self, keys, versions, now):
+        pids = sorted({pid for pid, _ in keys})
+        first_day = min(day for _, day in keys)
+        last_day = max(day for _, day in keys)
+
+        intervals = {key: [] for key in keys}
+        for pid, day, start, end in load_blocks(pids, first_day, last_day):
+            if (pid, day) in intervals:
+                intervals[(pid, day)].append((start, end))
+        for pid, start_at, end_at in load_bookings(pids, first_day, last_day):
+            for day, start, end in day_spans(start_at, end_at):
+                if (pid, day) in intervals:
+                    intervals[(pid, day)].append((start, end))
+
+        loaded = {key: DayIntervals(spans, versions[key], now) for key, spans in intervals.items()}
+        with self._lock:
+            for key, entry in loaded.items():
+                # Uma escrita durante a leitura invalida o que acabou de ser lido
+                if entry.version == self.version(*key):
+                    self._days[key] = entry
+                    self._days.move_to_end(key)
+            while len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+        return loaded
+
+    def invalidate(self, professional_id, day=None):
+        """Descarta um dia (ou todos os dias) da agenda do profissional."""
+        with self._lock:
+            if day is None:
+                self._bump(self._professional_versions, professional_id)
+            else:
+                key = (professional_id, day)
+                self._bump(self._day_versions, key)
+                self._days.pop(key, None)
+
+    def _bump(self, versions, key):
+        """Versão nova para ``key``; esquece as versões escritas há mais de um TTL."""
+        now = time.monotonic()
+        versions[key] = next(self._clock)
+        self._written_at[(versions is self._day_versions, key)] = now
+        self._written_at.move_to_end((versions is self._day_versions, key))
+        while self._written_at:
+            (is_day, old_key), written_at = next(iter(self._written_at.items()))
+            if now - written_at <= self.ttl:
+                break
+            del self._written_at[(is_day, old_key)]
+            (self._day_versions if is_day else self._professional_versions).pop(old_key, None)
+
+    def invalidate_appointment(self, appointment):
+        """Descarta os dias ocupados por um agendamento."""
+        if appointment.barbeiro_id is None or appointment.start_at is None:
+            return
+        end_at = appointment.end_at or appointment.start_at + timedelta(minutes=DEFAULT_DURACAO)
+        for day, _, _ in day_spans(appointment.start_at, end_at):
+            self.invalidate(appointment.barbeiro_id, day)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "days": len(self._days),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
+
+
+schedule_index = ScheduleIndex()
+
+
+# Bloqueios (BlockedTime) e expediente (WorkingHours) alterados por qualquer
+# caminho do ORM invalidam o profissional inteiro depois do commit
+def _changed_professionals(target):
+    # Registro transferido de profissional: o anterior também muda
+    return [target.profissional_id, *(inspect(target).attrs.profissional_id.history.deleted or ())]
+
+
+@commit_hooks.on_commit('schedule_index')
+def _apply_pending_invalidations(professional_ids):
+    for professional_id in professional_ids:
+        schedule_index.invalidate(professional_id)
+
+
+commit_hooks.watch((BlockedTime, WorkingHours), 'schedule_index', _changed_professionals)
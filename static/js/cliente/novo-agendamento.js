@@ -7,6 +7,7 @@ let bookingState = {
   date: null,
   time: null,
   services: [],
+  catalog: [],
   barbers: [],
   currentMonth: new Date().getMonth(),
   currentYear: new Date().getFullYear()
@@ -20,66 +21,40 @@ async function initNovoAgendamento() {
   bookingState.currentMonth = today.getMonth();
   bookingState.currentYear = today.getFullYear();
   
-  await Promise.all([loadBarbersData(), loadServicesData()]);
+  await loadBookingData();
   
   renderStep(1);
   updateProgress();
 }
 
 // ===== CARREGAMENTO DE DADOS =====
-async function loadServicesData() {
+async function loadBookingData() {
   try {
-    const timestamp = new Date().getTime();
-    const res = await fetch(`/api/services?_=${timestamp}`, { 
-      credentials: 'include',
-      cache: 'no-cache'
-    });
-    
-    if (!res.ok) throw new Error('Erro ao carregar serviços');
-    
-    const data = await res.json();
-    bookingState.services = data.data || [];
-    console.log('✅ Serviços carregados:', bookingState.services.length);
-  } catch (error) {
-    console.error('❌ Erro ao carregar serviços:', error);
-    showNotificationToast('Erro ao carregar serviços', 'error');
-  }
-}
-
-async function loadBarbersData() {
-  try {
-    const res = await fetch('/api/barbers', { credentials: 'include' });
+    const res = await fetch('/api/booking/bootstrap', { credentials: 'include' });
     
-    if (!res.ok) throw new Error('Erro ao carregar barbeiros');
+    if (!res.ok) throw new Error('Erro ao carregar dados do agendamento');
     
     const data = await res.json();
-    bookingState.barbers = data.data || [];
+    bookingState.catalog = data.data?.services || [];
+    bookingState.barbers = data.data?.professionals || [];
+    bookingState.services = bookingState.catalog;
+    console.log('✅ Serviços carregados:', bookingState.catalog.length);
     console.log('✅ Barbeiros carregados:', bookingState.barbers.length);
   } catch (error) {
-    console.error('❌ Erro ao carregar barbeiros:', error);
-    showNotificationToast('Erro ao carregar barbeiros', 'error');
+    console.error('❌ Erro ao carregar dados do agendamento:', error);
+    showNotificationToast('Erro ao carregar serviços e barbeiros', 'error');
   }
 }
 
-async function loadBarberPrices(barberId) {
-  try {
-    const response = await fetch(`/api/barber-prices?barbeiro_id=${barberId}`);
-    const result = await response.json();
-    
-    if (result.success && result.data) {
-      bookingState.services.forEach(service => {
-        const customPrice = result.data[service.nome];
-        if (customPrice !== undefined) {
-          service.preco = customPrice;
-        }
-      });
-      
-      if (bookingState.currentStep === 2) {
-        renderServices();
-      }
-    }
-  } catch (error) {
-    console.error('❌ Erro ao carregar preços:', error);
+function applyBarberPrices(barber) {
+  // Tabela do barbeiro já vem no bootstrap: só os serviços que ele oferece, com preço e duração dele
+  const table = barber.servicos || {};
+  bookingState.services = bookingState.catalog
+    .filter(service => table[service.id])
+    .map(service => ({ ...service, ...table[service.id] }));
+  
+  if (bookingState.currentStep === 2) {
+    renderServices();
   }
 }
 
@@ -136,7 +111,11 @@ async function selectBarber(barberId) {
   
   bookingState.barber = barber;
   renderBarbers();
-  await loadBarberPrices(barberId);
+  applyBarberPrices(barber);
+  if (bookingState.service) {
+    // Mantém o serviço escolhido se o novo barbeiro o oferece, com o preço dele
+    bookingState.service = bookingState.services.find(s => s.id === bookingState.service.id) || null;
+  }
   updateNextButton();
 }
 
@@ -365,40 +344,33 @@ async function loadAvailableTimes() {
   container.innerHTML = '<div class="loading-spinner"><i class="fas fa-spinner fa-spin"></i> Carregando horários...</div>';
   
   try {
-    const res = await fetch(`/api/appointments/for_barber/${bookingState.barber.id}?date=${bookingState.date}`, {
+    // Disponibilidade calculada no servidor (expediente, bloqueios e duração do serviço)
+    const serviceParam = bookingState.service ? `&service_id=${bookingState.service.id}` : '';
+    const res = await fetch(`/api/availability/${bookingState.barber.id}?date=${bookingState.date}${serviceParam}`, {
       credentials: 'include'
     });
     
-    let occupied = [];
-    if (res.ok) {
-      const data = await res.json();
-      occupied = (data.data || [])
-        .filter(a => a.status !== 'cancelado')
-        .map(a => a.time);
-    }
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    const data = await res.json();
+    // Grade do expediente com o status de cada horário definido pelo servidor
+    const slots = (data.data && data.data.grid[bookingState.date]) || [];
     
-    const times = [];
-    for (let hour = 8; hour < 18; hour++) {
-      times.push(`${hour.toString().padStart(2, '0')}:00`);
-      times.push(`${hour.toString().padStart(2, '0')}:30`);
+    if (slots.length === 0) {
+      container.innerHTML = `
+        <div class="empty-state">
+          <div class="empty-icon">
+            <i class="fas fa-calendar-times"></i>
+          </div>
+          <h3>Nenhum horário neste dia</h3>
+          <p>Escolha outra data</p>
+        </div>
+      `;
+      return;
     }
     
-    const selectedDate = new Date(bookingState.date + 'T00:00:00');
-    const today = new Date();
-    const isToday = selectedDate.toDateString() === today.toDateString();
-    
-    container.innerHTML = times.map((time, index) => {
-      const isOccupied = occupied.includes(time);
-      let isPast = false;
-      
-      if (isToday) {
-        const [hours, minutes] = time.split(':').map(Number);
-        const timeDate = new Date();
-        timeDate.setHours(hours, minutes, 0, 0);
-        isPast = timeDate <= today;
-      }
-      
-      const isDisabled = isOccupied || isPast;
+    container.innerHTML = slots.map(({ time, status }, index) => {
+      const isOccupied = status === 'ocupado';
+      const isDisabled = status !== 'livre';
       const isSelected = bookingState.time === time;
       
       const classes = [
@@ -413,7 +385,7 @@ async function loadAvailableTimes() {
              data-aos="fade-up"
              data-aos-delay="${index * 20}">
           <div class="time-icon">
-            <i class="fas ${isOccupied ? 'fa-lock' : isPast ? 'fa-clock' : 'fa-check'}"></i>
+            <i class="fas ${isOccupied ? 'fa-lock' : isDisabled ? 'fa-clock' : 'fa-check'}"></i>
           </div>
           <div class="time-value">${time}</div>
           ${isDisabled ? `
@@ -650,7 +622,8 @@ async function confirmarNovoAgendamento() {
         barber: null,
         date: null,
         time: null,
-        services: bookingState.services,
+        services: bookingState.catalog,
+        catalog: bookingState.catalog,
         barbers: bookingState.barbers,
         currentMonth: new Date().getMonth(),
         currentYear: new Date().getFullYear()
@@ -0,0 +1,52 @@
+"""Fixtures dos testes: app Flask com SQLite em memória (TestingConfig)."""
+import os
+import sys
+
+import pytest
+from flask import Flask, session
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import TestingConfig  # noqa: E402
+from db import db, Cliente, Service  # noqa: E402
+
+# Tabelas do fluxo de agendamento (as demais têm colunas só do MySQL)
+BOOKING_TABLES = ("clientes", "services", "professional_prices", "appointments", "appointment_slot_claims",
+                  "blocked_times", "working_hours", "appointment_daily_stats")
+
+
+@pytest.fixture
+def app():
+    """App sem tabelas: cada teste cria as que usa (há colunas só do MySQL, como LONGTEXT)."""
+    app = Flask(__name__)
+    app.config.from_object(TestingConfig)
+    app.secret_key = "test"
+    db.init_app(app)
+
+    with app.app_context():
+        # HOUR() do MySQL, usado pelas consultas de SQL puro
+        event.listen(db.engine, "connect", lambda dbapi_connection, _: dbapi_connection.create_function(
+            "HOUR", 1, lambda value: int(value[11:13]) if value else None
+        ))
+        db.engine.dispose()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def booking(app, monkeypatch):
+    """Tabelas de agendamento, um cliente (7) e um serviço de 30 min (3), com a cliente logada."""
+    from services import appointment_timer
+
+    # O convite de avaliação usa notificações em MySQL
+    monkeypatch.setattr(appointment_timer, "_completed_hooks", [])
+    db.metadata.create_all(db.engine, tables=[db.metadata.tables[name] for name in BOOKING_TABLES])
+    db.session.add(Cliente(id=7, nome="Ana", email="ana@example.com", senha="x"))
+    db.session.add(Service(id=3, nome="Corte", preco=40.0, duracao=30))
+    db.session.commit()
+
+    with app.test_request_context():
+        session.update(usuario_tipo="cliente", user_id=7, usuario_nome="Ana", usuario_email="ana@example.com")
+        yield
@@ -0,0 +1,53 @@
+"""get_dashboard_bundle: widgets em paralelo, com threads ou com greenlets."""
+import time
+
+import pytest
+
+import database_config
+from services import analytics_service
+
+
+def _slow(value):
+    def widget(user_id, user_type, period):
+        time.sleep(0.01)
+        return {"value": value, "user_id": user_id, "period": period}
+    return widget
+
+
+def _broken(user_id, user_type, period):
+    raise RuntimeError("consulta falhou")
+
+
+@pytest.fixture(params=[False, True], ids=["threads", "gevent"])
+def widgets(request, monkeypatch):
+    monkeypatch.setattr(database_config, "_gevent_sem_patch", lambda: request.param)
+    monkeypatch.setattr(analytics_service, "_executor", None)
+    monkeypatch.setattr(analytics_service, "WIDGETS", {
+        "a": (_slow("a"), False),
+        "b": (_slow("b"), False),
+        "c": (_slow("c"), False),
+        "quebrado": (_broken, False),
+        "so-barbeiro": (_slow("x"), True),
+    })
+    yield request.param
+    analytics_service._executor = None
+
+
+def test_bundle_collects_data_and_errors(widgets):
+    result = analytics_service.get_dashboard_bundle(5, "cliente", ["a", "b", "c", "quebrado", "so-barbeiro"], "week")
+
+    assert result["data"] == {name: {"value": name, "user_id": 5, "period": "week"} for name in "abc"}
+    assert result["errors"] == {"quebrado": "consulta falhou", "so-barbeiro": "Acesso negado"}
+    assert isinstance(analytics_service._executor, database_config._GreenletExecutor) is widgets
+
+
+def test_bundle_barber_widgets_and_duplicates(widgets):
+    result = analytics_service.get_dashboard_bundle(1, "barbeiro", ["so-barbeiro", "a", "a"])
+
+    assert set(result["data"]) == {"so-barbeiro", "a"}
+    assert result["errors"] == {}
+
+
+def test_bundle_rejects_unknown_widget(widgets):
+    with pytest.raises(ValueError):
+        analytics_service.get_dashboard_bundle(1, "barbeiro", ["a", "nao-existe"])
@@ -0,0 +1,76 @@
+"""AnalyticsCache: single-flight e invalidação por dono."""
+import pytest
+
+import database_config
+from database_config import get_database_connection, tolerates_replica_lag
+from services import analytics_cache as analytics_cache_module
+from services.analytics_cache import AnalyticsCache, cached_result
+
+OWNER = ('barbeiro', 1)
+
+
+def test_single_flight_with_unpatched_gevent(monkeypatch):
+    gevent = pytest.importorskip("gevent")
+    monkeypatch.setattr(database_config, "_gevent_sem_patch", lambda: True)
+    cache = AnalyticsCache(max_entries=10, ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        # O líder cede o hub (como ao esperar uma conexão do pool) enquanto os outros esperam
+        gevent.sleep(0.01)
+        return {"total": 3}
+
+    greenlets = [gevent.spawn(cache.get_or_compute, OWNER, "dashboard", (), compute) for _ in range(3)]
+    gevent.joinall(greenlets, timeout=2)
+
+    assert [g.value for g in greenlets] == [{"total": 3}] * 3
+    assert len(calls) == 1
+    assert cache.stats()["waits"] == 2
+
+
+def test_invalidate_recomputes_only_the_owner():
+    cache = AnalyticsCache(max_entries=10, ttl=60)
+    values = iter(range(10))
+
+    def compute():
+        return next(values)
+
+    assert cache.get_or_compute(OWNER, "dashboard", (), compute) == 0
+    assert cache.get_or_compute(('cliente', 2), "dashboard", (), compute) == 1
+    cache.invalidate(OWNER)
+    assert cache.get_or_compute(OWNER, "dashboard", (), compute) == 2
+    assert cache.get_or_compute(('cliente', 2), "dashboard", (), compute) == 1
+
+
+def test_recompute_after_write_reads_primary(monkeypatch):
+    class Pool:
+        def acquire(self):
+            return "primario"
+
+    monkeypatch.setattr(database_config, "_acquire_replica", lambda max_lag: "replica")
+    monkeypatch.setattr(database_config, "get_pool", lambda: Pool())
+    monkeypatch.setattr(analytics_cache_module, "analytics_cache", AnalyticsCache(max_entries=10, ttl=60))
+
+    @cached_result('dashboard', user_type='barbeiro')
+    @tolerates_replica_lag()
+    def dashboard(user_id):
+        return get_database_connection()
+
+    assert dashboard(1) == "replica"
+    analytics_cache_module.analytics_cache.invalidate(OWNER)
+    assert dashboard(1) == "primario"
+    # Outros donos continuam lendo da réplica
+    assert dashboard(2) == "replica"
+
+
+def test_recent_writes_expire_with_replica_lag(monkeypatch):
+    cache = AnalyticsCache(max_entries=10, ttl=60)
+    cache.invalidate(OWNER)
+    assert cache.recently_written(OWNER)
+
+    monkeypatch.setattr(database_config.Config, "DB_REPLICA_MAX_LAG", -1)
+    assert not cache.recently_written(OWNER)
+    cache.invalidate(('cliente', 2))
+    # A invalidação seguinte descarta as escritas que já saíram da janela
+    assert OWNER not in cache._written_at
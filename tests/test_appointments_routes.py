@@ -0,0 +1,89 @@
+"""Rotas de agendamento: POST /api/appointments e /api/appointments/series."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import Appointment
+from routes.appointments import appointments_bp
+
+DAY = datetime.now() + timedelta(days=3)
+
+
+def _date(weeks=0):
+    return (DAY + timedelta(weeks=weeks)).strftime("%Y-%m-%d")
+
+
+BOOKING = {"barberId": 1, "barberName": "Bruno", "serviceId": 3, "serviceName": "Corte"}
+
+
+@pytest.fixture
+def client(app, booking):
+    app.register_blueprint(appointments_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(usuario_tipo="cliente", user_id=7, usuario_nome="Ana", usuario_email="ana@example.com")
+    return client
+
+
+def _book(client, date, time="10:00"):
+    return client.post("/api/appointments", json={**BOOKING, "date": date, "time": time})
+
+
+def _series(client, **body):
+    return client.post("/api/appointments/series", json={
+        **BOOKING, "date": _date(), "time": "10:00", "every_weeks": 1, "count": 3, **body
+    })
+
+
+def test_overlapping_booking_returns_409(client):
+    assert _book(client, _date()).status_code == 201
+
+    response = _book(client, _date(), "10:15")
+
+    assert response.status_code == 409
+    assert response.get_json() == {"success": False, "message": "Horário já agendado"}
+    assert _book(client, _date(), "10:30").status_code == 201
+
+
+def test_series_skips_conflicts_by_default(client):
+    assert _book(client, _date(1)).status_code == 201
+
+    response = _series(client)
+
+    assert response.status_code == 201
+    report = response.get_json()["data"]["report"]
+    assert [entry["status"] for entry in report] == ["agendado", "conflito", "agendado"]
+    assert Appointment.query.count() == 3
+
+
+def test_series_all_or_nothing(client):
+    assert _book(client, _date(2)).status_code == 201
+
+    response = _series(client, skip_conflicts=False)
+
+    assert response.status_code == 409
+    report = response.get_json()["data"]["report"]
+    assert [entry["status"] for entry in report] == ["nao_criado", "nao_criado", "conflito"]
+    assert Appointment.query.count() == 1
+
+
+def test_series_without_any_free_occurrence(client):
+    for weeks in range(3):
+        assert _book(client, _date(weeks)).status_code == 201
+
+    assert _series(client).status_code == 409
+    assert Appointment.query.count() == 3
+
+
+@pytest.mark.parametrize("value", ["false", "0", 0, 1, None, []])
+def test_series_rejects_non_boolean_skip_conflicts(client, value):
+    response = _series(client, skip_conflicts=value)
+
+    assert response.status_code == 400
+    assert Appointment.query.count() == 0
+
+
+@pytest.mark.parametrize("body", [{"count": 0}, {"every_weeks": 0}, {"count": 10_000},
+                                  {"occurrences": "amanhã"}])
+def test_series_validates_before_generating(client, body):
+    assert _series(client, **body).status_code == 400
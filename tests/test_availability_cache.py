@@ -0,0 +1,24 @@
+"""AvailabilityCache: validade pela versão do dia e pelo TTL do índice."""
+from datetime import date
+
+from services.availability_cache import AvailabilityCache
+from services.schedule_index import schedule_index
+
+DAY = date(2030, 1, 7)
+
+
+def test_ttl_never_exceeds_schedule_index_ttl():
+    assert AvailabilityCache(ttl=schedule_index.ttl * 5).ttl == schedule_index.ttl
+    assert AvailabilityCache(ttl=1).ttl == min(1, schedule_index.ttl)
+    assert AvailabilityCache().ttl <= schedule_index.ttl
+
+
+def test_entry_is_stale_after_local_write():
+    cache = AvailabilityCache(max_entries=10)
+    cache.put(1, DAY, 30, [540, 570], schedule_index.version(1, DAY))
+    assert cache.get(1, DAY, 30) == [540, 570]
+
+    schedule_index.invalidate(1, DAY)
+
+    assert cache.get(1, DAY, 30) is None
+    assert cache.stats()["stale"] == 1
@@ -0,0 +1,70 @@
+"""A tabela de fatos mantida a cada escrita bate com ``daily_stats.rebuild``."""
+from datetime import datetime, timedelta
+
+import daily_stats
+from db import db, Appointment, AppointmentDailyStat
+from services import appointment_service
+
+
+def _counts():
+    """{chave: contagem} da tabela de fatos, sem as linhas zeradas."""
+    return {
+        (row.barbeiro_id, row.day, row.hour, row.cliente_id, row.servico_id, row.status): row.appointments
+        for row in AppointmentDailyStat.query if row.appointments
+    }
+
+
+def _assert_matches_rebuild():
+    maintained = _counts()
+    cursor = db.session.connection().connection.cursor()
+    try:
+        daily_stats.rebuild(cursor)
+    finally:
+        cursor.close()
+    db.session.expire_all()
+    assert maintained == _counts()
+
+
+def _book(day, time="10:00"):
+    return appointment_service.create_appointment({
+        "barberId": 1, "barberName": "Bruno", "serviceId": 3, "serviceName": "Corte",
+        "date": day.strftime("%Y-%m-%d"), "time": time,
+    })
+
+
+def test_create_cancel_and_reschedule(booking):
+    day = datetime.now() + timedelta(days=3)
+    first = _book(day)
+    second = _book(day, "14:00")
+    _assert_matches_rebuild()
+
+    assert appointment_service.cancel_appointment_by_id(first["id"])
+    _assert_matches_rebuild()
+
+    appointment = db.session.get(Appointment, second["id"])
+    appointment.start_at += timedelta(days=1, hours=2)
+    appointment.end_at += timedelta(days=1, hours=2)
+    db.session.commit()
+    _assert_matches_rebuild()
+
+    assert appointment_service.update_appointment_status(first["id"], "agendado")
+    _assert_matches_rebuild()
+
+
+def test_series(booking):
+    start = datetime.now() + timedelta(days=2)
+    result = appointment_service.create_appointment_series(
+        {"barberId": 1, "barberName": "Bruno", "serviceId": 3, "serviceName": "Corte"},
+        appointment_service.series_occurrences(start.strftime("%Y-%m-%d"), "09:00", every_weeks=1, count=4)
+    )
+    assert len(result["created"]) == 4
+    _assert_matches_rebuild()
+
+
+def test_auto_complete(booking):
+    past = datetime.now() - timedelta(days=1)
+    _book(past, "08:00")
+    _book(past, "09:00")
+    assert appointment_service.auto_complete_past_appointments() == 2
+    assert {row.status for row in AppointmentDailyStat.query if row.appointments} == {"concluido"}
+    _assert_matches_rebuild()
@@ -0,0 +1,221 @@
+"""Pool de conexões e conexão compartilhada por requisição (com uma conexão pymysql falsa)."""
+import pymysql
+import pytest
+from flask import Flask, jsonify
+
+import database_config
+from database_config import ConnectionPool, get_database_connection
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql, args=None):
+        connection = self.connection
+        connection.statements.append(sql)
+        if sql.startswith("SAVEPOINT "):
+            connection.savepoints[sql.split()[1]] = len(connection.pending)
+        elif sql.startswith("ROLLBACK TO SAVEPOINT "):
+            name = sql.split()[-1]
+            if name not in connection.savepoints:
+                raise pymysql.err.OperationalError(1305, f"SAVEPOINT {name} does not exist")
+            del connection.pending[connection.savepoints[name]:]
+        elif sql.startswith("CREATE "):
+            # DDL confirma a transação implicitamente
+            connection.commit()
+        elif sql.startswith("INSERT "):
+            connection.pending.append(args)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Transação em memória: INSERTs pendentes até o commit, com savepoints."""
+
+    def __init__(self):
+        self.open = True
+        self.broken = False
+        self.committed, self.pending = [], []
+        self.savepoints = {}
+        self.statements = []
+        self.rollbacks = 0
+
+    def cursor(self, *args):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.committed += self.pending
+        self.pending = []
+        self.savepoints.clear()
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.pending = []
+        self.savepoints.clear()
+
+    def ping(self, reconnect=False):
+        if self.broken:
+            raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = ConnectionPool({}, max_size=2, timeout=0.05)
+    connections = []
+
+    def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(pool, "_connect", connect)
+    monkeypatch.setattr(database_config, "get_pool", lambda: pool)
+    pool.connections = connections
+    return pool
+
+
+def _insert_service(value, fail=False):
+    """Serviço no padrão dos de SQL puro: INSERT, commit; rollback em erro."""
+    conn = get_database_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute("INSERT INTO t VALUES (%s)", (value,))
+        if fail:
+            raise RuntimeError("falhou")
+        conn.commit()
+        return True
+    except Exception:
+        conn.rollback()
+        return False
+    finally:
+        cursor.close()
+        conn.close()
+
+
+@pytest.fixture
+def client(pool):
+    app = Flask(__name__)
+    database_config.init_app(app)
+    app.after_commit_calls = []
+
+    @app.post("/duas-escritas")
+    def duas_escritas():
+        first = _insert_service("a")
+        database_config.call_after_commit(lambda: app.after_commit_calls.append("a"))
+        second = _insert_service("b", fail=True)
+        return jsonify({"first": first, "second": second})
+
+    @app.post("/ddl")
+    def ddl():
+        _insert_service("a")
+        conn = get_database_connection()
+        cursor = conn.cursor()
+        cursor.execute("CREATE TABLE x (id INT)")
+        cursor.execute("INSERT INTO t VALUES (%s)", ("b",))
+        conn.rollback()
+        return jsonify({})
+
+    return app.test_client()
+
+
+def test_rollback_of_one_service_keeps_the_others(client, pool):
+    response = client.post("/duas-escritas")
+
+    assert response.get_json() == {"first": True, "second": False}
+    connection, = pool.connections
+    assert connection.committed == [("a",)]
+    assert client.application.after_commit_calls == ["a"]
+    assert pool.stats()["in_use"] == 0
+
+
+def test_rollback_after_ddl_falls_back_to_full_rollback(client, pool):
+    client.post("/ddl")
+
+    connection, = pool.connections
+    # O CREATE confirmou o "a" implicitamente; o "b" foi desfeito
+    assert connection.committed == [("a",)]
+    assert connection.pending == []
+
+
+def test_checkout_limit_and_timeout(pool):
+    first, second = pool.acquire(), pool.acquire()
+
+    with pytest.raises(database_config.PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+    first.close()
+    third = pool.acquire()
+    # A conexão devolvida é reaproveitada
+    assert third._raw is first._raw
+    second.close()
+    third.close()
+    assert pool.stats()["in_use"] == 0
+    assert len(pool.connections) == 2
+
+
+def test_close_rolls_back_and_returns_connection(pool):
+    conn = pool.acquire()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO t VALUES (%s)", ("a",))
+    conn.commit()
+    # Comando depois do commit: transação implícita aberta de novo
+    cursor.execute("INSERT INTO t VALUES (%s)", ("b",))
+    conn.close()
+    conn.close()
+
+    raw, = pool.connections
+    assert raw.committed == [("a",)]
+    assert raw.pending == []
+    assert raw.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_discard_closes_instead_of_returning(pool):
+    conn = pool.acquire()
+    conn.discard()
+
+    raw, = pool.connections
+    assert not raw.open
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["discarded"] == 1
+
+
+def test_broken_connection_on_release_is_discarded(pool):
+    conn = pool.acquire()
+    conn._raw.open = False
+    conn.close()
+
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["discarded"] == 1
+
+
+def test_idle_connection_is_pinged_and_replaced_when_dead(pool):
+    pool.ping_after = 0
+    conn = pool.acquire()
+    conn.close()
+    pool.connections[0].broken = True
+
+    replacement = pool.acquire()
+
+    assert replacement._raw is pool.connections[1]
+    assert not pool.connections[0].open
+    assert pool.stats()["discarded"] == 1
+    replacement.close()
+
+
+def test_expired_idle_connections_are_closed(pool):
+    pool.idle_timeout = 0
+    conn = pool.acquire()
+    conn.close()
+    pool._idle[0] = (pool._idle[0][0], pool._idle[0][1] - 1)
+
+    fresh = pool.acquire()
+
+    assert fresh._raw is pool.connections[1]
+    assert not pool.connections[0].open
+    fresh.close()
@@ -0,0 +1,40 @@
+"""ScheduleIndex: versões das agendas (limitadas e sem repetição)."""
+from datetime import date, timedelta
+
+from services.schedule_index import ScheduleIndex
+
+DAY = date(2030, 1, 7)
+
+
+def test_versions_change_on_every_write():
+    index = ScheduleIndex(max_days=10, ttl=60)
+    seen = {index.version(1, DAY)}
+    for _ in range(3):
+        index.invalidate(1, DAY)
+        seen.add(index.version(1, DAY))
+    index.invalidate(1)
+    seen.add(index.version(1, DAY))
+
+    assert len(seen) == 5
+    assert index.version(2, DAY) == (0, 0)
+
+
+def test_old_versions_are_forgotten():
+    index = ScheduleIndex(max_days=10, ttl=0)
+    for offset in range(100):
+        index.invalidate(offset % 5, DAY + timedelta(days=offset))
+    index.invalidate(3)
+
+    # Só sobra a escrita mais recente (TTL zero)
+    assert len(index._day_versions) + len(index._professional_versions) <= 1
+    assert len(index._written_at) <= 1
+
+
+def test_forgotten_version_is_not_reused():
+    index = ScheduleIndex(max_days=10, ttl=0)
+    index.invalidate(1, DAY)
+    first = index.version(1, DAY)
+    index.invalidate(2, DAY)
+    index.invalidate(1, DAY)
+
+    assert index.version(1, DAY) not in (first, (0, 0))
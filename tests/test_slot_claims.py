@@ -0,0 +1,100 @@
+"""Reserva de blocos (appointment_slot_claims): o INSERT decide conflitos com agendamentos e bloqueios."""
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import db, AppointmentSlotClaim, BlockedTime, block_claim_id
+from services import appointment_service
+from services.appointment_service import SlotUnavailableError
+
+DAY = (datetime.now() + timedelta(days=3)).strftime("%Y-%m-%d")
+
+
+def _book(time, day=DAY):
+    return appointment_service.create_appointment({
+        "barberId": 1, "barberName": "Bruno", "serviceId": 3, "serviceName": "Corte",
+        "date": day, "time": time,
+    })
+
+
+def _block(start, end, day=DAY):
+    block = BlockedTime(profissional_id=1, data=day, hora_inicio=start, hora_fim=end, motivo="Almoço")
+    db.session.add(block)
+    db.session.commit()
+    return block
+
+
+def _claim_owners():
+    return {claim.appointment_id for claim in AppointmentSlotClaim.query}
+
+
+def test_overlapping_booking_is_rejected(booking):
+    _book("10:00")
+
+    for time in ("10:00", "10:15", "09:45"):
+        with pytest.raises(SlotUnavailableError, match="já agendado"):
+            _book(time)
+    assert AppointmentSlotClaim.query.count() == 2
+
+
+def test_adjacent_bookings_do_not_conflict(booking):
+    _book("10:00")
+    _book("10:30")
+    _book("09:30")
+
+    assert AppointmentSlotClaim.query.count() == 6
+
+
+def test_cancel_releases_the_slot(booking):
+    first = _book("10:00")
+    assert appointment_service.cancel_appointment_by_id(first["id"])
+    assert AppointmentSlotClaim.query.filter_by(appointment_id=first["id"]).count() == 0
+
+    second = _book("10:00")
+    # Reativar o cancelado esbarra na reserva do novo agendamento
+    with pytest.raises(SlotUnavailableError):
+        appointment_service.update_appointment_status(first["id"], "agendado")
+    assert {claim.appointment_id for claim in AppointmentSlotClaim.query} == {second["id"]}
+
+
+def test_blocked_time_rejects_booking(booking):
+    _block("12:00", "13:00")
+
+    with pytest.raises(SlotUnavailableError, match="bloqueado"):
+        _book("12:30")
+    # Logo antes do bloqueio continua livre
+    _book("11:30")
+
+
+def test_block_claims_follow_block_changes(booking):
+    block = _block("12:00", "13:00")
+    block.hora_inicio, block.hora_fim = "15:00", "15:30"
+    db.session.commit()
+    _book("12:00")
+
+    db.session.delete(block)
+    db.session.commit()
+    assert block_claim_id(block.id) not in _claim_owners()
+    _book("15:00")
+
+
+def test_block_over_booking_keeps_slot_after_cancel(booking):
+    booked = _book("12:00")
+    block = _block("12:00", "13:00")
+    assert AppointmentSlotClaim.query.filter_by(appointment_id=booked["id"]).count() == 2
+
+    assert appointment_service.cancel_appointment_by_id(booked["id"])
+    # Os blocos liberados pelo cancelamento voltam para o bloqueio
+    with pytest.raises(SlotUnavailableError, match="bloqueado"):
+        _book("12:00")
+    assert AppointmentSlotClaim.query.filter_by(appointment_id=block_claim_id(block.id)).count() == 4
+
+
+def test_series_reports_blocked_occurrences(booking):
+    _block("09:00", "10:00")
+    result = appointment_service.create_appointment_series(
+        {"barberId": 1, "barberName": "Bruno", "serviceId": 3, "serviceName": "Corte"},
+        [(DAY, "09:00"), (DAY, "10:00")]
+    )
+
+    assert [entry["status"] for entry in result["report"]] == ["bloqueado", "agendado"]